@@ -94,11 +94,10 @@ def _premium_info(db_path: Path, username: Optional[str]) -> tuple[bool, int]:
         return (False, 0)
     try:
         p = db.is_premium(db_path, username)
-        import time as _t
-        active = bool(p.get("active")) and int(p.get("until", 0)) > int(_t.time())
+        active = bool(p.get("active")) and int(p.get("until", 0)) > int(time.time())
         rem = 0
         if active:
-            rem = max(0, int(p.get("until", 0)) - int(_t.time()))
+            rem = max(0, int(p.get("until", 0)) - int(time.time()))
         return (active, rem)
     except Exception:
         return (False, 0)
@@ -265,7 +264,6 @@ def start_earn_session(db_path: Path, username: str, stake_seconds: int) -> dict
     premium_applied = False
     premium_extra = 0
     prem = db.is_premium(db_path, username)
-    import time as _t
     if bool(prem.get("active")):
         tier = db.get_user_premium_tier(db_path, username)
         bonus_pct = float(tier.get("earn_bonus_percent", 0.10))
@@ -345,7 +343,6 @@ def start_earn_session_to_progress(db_path: Path, username: str, stake_seconds:
     premium_applied = False
     premium_extra = 0
     prem = db.is_premium(db_path, username)
-    import time as _t
     if bool(prem.get("active")):
         tier = db.get_user_premium_tier(db_path, username)
         bonus_pct = float(tier.get("earn_bonus_percent", 0.10))
@@ -430,7 +427,6 @@ def start_open_earn_session(db_path: Path, username: str) -> dict:
                     total_base = int(elapsed_stop + bonus_stop)
                     penalized = int(round(total_base * 0.75))
                     prem = db.is_premium(db_path, username)
-                    import time as _t
                     if bool(prem.get("active")):
                         tier = db.get_user_premium_tier(db_path, username)
                         bonus_pct = float(tier.get("earn_bonus_percent", 0.10))
@@ -515,7 +511,6 @@ def start_open_earn_session(db_path: Path, username: str) -> dict:
                             penalized = int(round(total_base * 0.75))
                             # Apply premium +10% if active at stop time
                             prem = db.is_premium(db_path, username)
-                            import time as _t
                             if bool(prem.get("active")):
                                 tier = db.get_user_premium_tier(db_path, username)
                                 bonus_pct = float(tier.get("earn_bonus_percent", 0.10))
@@ -581,7 +576,6 @@ def start_open_earn_session(db_path: Path, username: str) -> dict:
     premium_applied = False
     premium_extra = 0
     prem = db.is_premium(db_path, username)
-    import time as _t
     if bool(prem.get("active")):
         tier = db.get_user_premium_tier(db_path, username)
         bonus_pct = float(tier.get("earn_bonus_percent", 0.10))
@@ -659,7 +653,6 @@ def start_open_earn_session_to_progress(db_path: Path, username: str) -> dict:
                     total_base = int(elapsed_stop + bonus_stop)
                     penalized = int(round(total_base * 0.75))
                     prem = db.is_premium(db_path, username)
-                    import time as _t
                     if bool(prem.get("active")):
                         tier = db.get_user_premium_tier(db_path, username)
                         bonus_pct = float(tier.get("earn_bonus_percent", 0.10))
@@ -733,7 +726,6 @@ def start_open_earn_session_to_progress(db_path: Path, username: str) -> dict:
                             total_base = int(elapsed_stop + bonus_stop)
                             penalized = int(round(total_base * 0.75))
                             prem = db.is_premium(db_path, username)
-                            import time as _t
                             if bool(prem.get("active")):
                                 tier = db.get_user_premium_tier(db_path, username)
                                 bonus_pct = float(tier.get("earn_bonus_percent", 0.10))
@@ -782,7 +774,6 @@ def start_open_earn_session_to_progress(db_path: Path, username: str) -> dict:
     premium_applied = False
     premium_extra = 0
     prem = db.is_premium(db_path, username)
-    import time as _t
     if bool(prem.get("active")):
         tier = db.get_user_premium_tier(db_path, username)
         bonus_pct = float(tier.get("earn_bonus_percent", 0.10))
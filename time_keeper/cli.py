@@ -5,6 +5,7 @@ import os
 import subprocess
 import platform
 import signal
+import time
 from pathlib import Path
 from typing import Optional
 
@@ -64,6 +65,7 @@ def parse_args(argv: Optional[list] = None) -> argparse.Namespace:
 
     p_worker = sub.add_parser("run-worker", help="Run background worker to deduct time every second")
     p_worker.add_argument("--interval", type=float, default=1.0)
+    p_worker.add_argument("--batch", type=int, default=1, help="Ticks applied per commit (fewer commits, coarser balance updates)")
     p_worker.add_argument("--background", action="store_true", help="Run the worker in the background")
     p_worker.add_argument("--pid-file", type=str, help="Path to PID file (default next to DB)")
     p_worker.add_argument("--log-file", type=str, help="Path to log file (default next to DB)")
@@ -236,8 +238,8 @@ def cmd_leaderboard(db_path: Path, limit: int) -> None:
     print_table(["Rank", "Username", "Balance", "Status"], table_rows)
 
 
-def cmd_run_worker(db_path: Path, interval: float) -> None:
-    run_worker(db_path, interval_seconds=interval)
+def cmd_run_worker(db_path: Path, interval: float, batch: int = 1) -> None:
+    run_worker(db_path, interval_seconds=interval, batch_ticks=batch)
 
 def _default_pid_log(db_path: Path) -> tuple[Path, Path]:
     base = db_path.with_suffix("")
@@ -268,7 +270,7 @@ def _stop_process(pid: int) -> bool:
     except Exception:
         return False
 
-def start_worker_background(db_path: Path, interval: float, pid_file: Path, log_file: Path) -> None:
+def start_worker_background(db_path: Path, interval: float, pid_file: Path, log_file: Path, batch: int = 1) -> None:
     if pid_file.exists():
         try:
             pid = int(pid_file.read_text().strip())
@@ -292,7 +294,7 @@ def start_worker_background(db_path: Path, interval: float, pid_file: Path, log_
         creationflags = subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.DETACHED_PROCESS
 
     with open(log_file, "ab", buffering=0) as lf:
-        args = [sys.executable, "-m", "time_keeper.cli", "run-worker", "--db", str(db_path), "--interval", str(interval)]
+        args = [sys.executable, "-m", "time_keeper.cli", "run-worker", "--db", str(db_path), "--interval", str(interval), "--batch", str(batch)]
         proc = subprocess.Popen(args, stdout=lf, stderr=lf, stdin=subprocess.DEVNULL, creationflags=creationflags, close_fds=(platform.system() != "Windows"))
         pid_file.write_text(str(proc.pid))
         print(Fore.GREEN + f"Worker started in background (pid {proc.pid}). Logs: {log_file}")
@@ -488,8 +490,7 @@ def interactive_menu(db_path: Path) -> None:
             human = formatting.format_duration(int(bal), style="short", max_parts=2)
             # Premium status and tier display
             prem = db.is_premium(current_db, uname)
-            import time as _t
-            now = int(_t.time())
+            now = int(time.time())
             prem_badge = "premium" if prem.get("active") else "standard"
             # Tier: Roman numerals I-X
             try:
@@ -954,9 +955,9 @@ def main(argv: Optional[list] = None) -> None:
         elif ns.status:
             status_worker_background(pid_file)
         elif ns.background:
-            start_worker_background(db_path, ns.interval, pid_file, log_file)
+            start_worker_background(db_path, ns.interval, pid_file, log_file, ns.batch)
         else:
-            cmd_run_worker(db_path, ns.interval)
+            cmd_run_worker(db_path, ns.interval, ns.batch)
     elif ns.cmd == "bulk-create":
         cmd_bulk_create(
             db_path,
@@ -1,15 +1,18 @@
+import atexit
+import bisect
+import os
+import queue
 import sqlite3
+import threading
 import time
-import random
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, List, Tuple, Dict, Any
+from typing import Optional, List, Tuple, Dict, Any, Iterator
 
 DEFAULT_INITIAL_SECONDS = 86400  # 1 day
 
 SCHEMA_SQL = """
 PRAGMA journal_mode = WAL;
-PRAGMA foreign_keys = ON;
 
 CREATE TABLE IF NOT EXISTS users (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -22,8 +25,15 @@ CREATE TABLE IF NOT EXISTS users (
     deactivated_at INTEGER
 );
 
-CREATE INDEX IF NOT EXISTS idx_users_active ON users(active);
-CREATE INDEX IF NOT EXISTS idx_users_balance ON users(balance_seconds);
+-- Every lookup filters on the literal active = 1, so deactivated accounts are left
+-- out of the index; keyed on active rather than balance_seconds, which every tick rewrites
+CREATE INDEX IF NOT EXISTS idx_users_active_only ON users(active) WHERE active = 1;
+DROP INDEX IF EXISTS idx_users_active;
+-- Holds only users at or below zero balance, so the per-tick deactivation pass
+-- finds them without walking every active user after the deduction just did
+CREATE INDEX IF NOT EXISTS idx_users_depleted ON users(active) WHERE balance_seconds <= 0;
+-- Unused by any query but rewritten on every per-second balance update
+DROP INDEX IF EXISTS idx_users_balance;
 
 CREATE TABLE IF NOT EXISTS time_reserves (
     id INTEGER PRIMARY KEY CHECK (id = 1),
@@ -33,27 +43,378 @@ CREATE TABLE IF NOT EXISTS time_reserves (
 INSERT OR IGNORE INTO time_reserves (id, total_seconds) VALUES (1, 0);
 """
 
+# sqlite3 keeps an LRU of prepared statements per connection keyed by SQL text.
+# Pooled connections live across calls, so this is sized to hold every distinct
+# statement in this module (~170) plus the companion CLIs' without evictions.
+STATEMENT_CACHE_SIZE = 256
+
+# How long a connection waits on another process's write lock before SQLITE_BUSY.
+# Writers take the lock up front with BEGIN IMMEDIATE, so this is where they queue.
+BUSY_TIMEOUT_SECONDS = 5.0
+
+# Per-connection settings (journal_mode=WAL is persistent and lives in SCHEMA_SQL).
+# synchronous=NORMAL is durable across application crashes in WAL mode and only
+# fsyncs at checkpoints instead of on every commit.
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -64000",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA foreign_keys = ON",
+)
+
+# Hot-path SQL kept as module constants so every call hits the statement cache.
+# Writers return post-state with UPDATE ... RETURNING (SQLite >= 3.35).
+_SQL_GET_BALANCE = "SELECT balance_seconds FROM users WHERE username = ?"
+_SQL_TICK_DEDUCT = "UPDATE users SET balance_seconds = balance_seconds - 1 WHERE active = 1 AND balance_seconds > 0"
+# Batched ticks: what n seconds would take (nobody goes below zero), then take it
+_SQL_TICK_DEDUCTIBLE = "SELECT COALESCE(SUM(MIN(balance_seconds, ?)), 0) FROM users WHERE active = 1 AND balance_seconds > 0"
+_SQL_TICK_DEDUCT_N = "UPDATE users SET balance_seconds = MAX(0, balance_seconds - ?) WHERE active = 1 AND balance_seconds > 0"
+_SQL_TICK_ACCRUE_RESERVES = (
+    "INSERT INTO time_reserves(id, total_seconds) VALUES (1, ?)\n"
+    "ON CONFLICT(id) DO UPDATE SET total_seconds = total_seconds + excluded.total_seconds"
+)
+# Stat cap for users row u: the premium tier's stat_cap_percent while premium is
+# active (250 if no tier matches), else 100. Binds one parameter: now.
+_SQL_STAT_CAP = (
+    "CASE WHEN u.premium_is_lifetime = 1 OR u.premium_until > ? THEN COALESCE(\n"
+    "  (SELECT t.stat_cap_percent FROM premium_tiers t WHERE t.min_seconds <= u.premium_lifetime_seconds ORDER BY t.min_seconds DESC LIMIT 1), 250)\n"
+    "  ELSE 100 END"
+)
+# Stat deltas clamped to [0, cap]
+_SQL_APPLY_STAT_DELTAS = (
+    "UPDATE users SET energy = MAX(0, MIN(c.upper, energy + ?)), hunger = MAX(0, MIN(c.upper, hunger + ?)), water = MAX(0, MIN(c.upper, water + ?))\n"
+    f"FROM (SELECT u.id, {_SQL_STAT_CAP} AS upper FROM users u WHERE u.username = ?) AS c\n"
+    "WHERE users.id = c.id RETURNING energy, hunger, water"
+)
+# Using quantity x of an item: its restore_* effects scaled by x, clamped to [0, cap].
+# No row back means the item is not in the catalog.
+_SQL_USE_ITEM_STATS = (
+    "UPDATE users SET energy = MAX(0, MIN(c.upper, energy + e.restore_energy * ?)),\n"
+    "  hunger = MAX(0, MIN(c.upper, hunger + e.restore_hunger * ?)), water = MAX(0, MIN(c.upper, water + e.restore_water * ?))\n"
+    f"FROM (SELECT u.id, {_SQL_STAT_CAP} AS upper FROM users u WHERE u.id = ?) AS c\n"
+    "JOIN time_store_catalog e ON e.item = ?\n"
+    "WHERE users.id = c.id RETURNING energy, hunger, water"
+)
+# Refill stats to the cap. Unlike _SQL_STAT_CAP, a premium user with no matching tier
+# (or a tier cap of 0) is filled to 100. Binds now first.
+_SQL_FILL_STAT_CAP = (
+    "CASE WHEN u.premium_is_lifetime = 1 OR u.premium_until > ? THEN COALESCE(\n"
+    "  (SELECT CASE WHEN t.stat_cap_percent > 0 THEN t.stat_cap_percent END FROM premium_tiers t\n"
+    "   WHERE t.min_seconds <= u.premium_lifetime_seconds ORDER BY t.min_seconds DESC, t.tier DESC LIMIT 1), 100)\n"
+    "  ELSE 100 END"
+)
+_SQL_FILL_USER_STATS = (
+    "UPDATE users SET energy = c.cap, hunger = c.cap, water = c.cap\n"
+    f"FROM (SELECT u.id, {_SQL_FILL_STAT_CAP} AS cap FROM users u WHERE u.username = ?) AS c WHERE users.id = c.id"
+)
+_SQL_FILL_ALL_STATS = (
+    "UPDATE users SET energy = c.cap, hunger = c.cap, water = c.cap\n"
+    f"FROM (SELECT u.id, {_SQL_FILL_STAT_CAP} AS cap FROM users u) AS c WHERE users.id = c.id"
+)
+# Take x of an item from a user's inventory by username, only if they hold at least x
+_SQL_TAKE_INVENTORY_BY_NAME = (
+    "UPDATE user_inventory SET qty = qty - ? FROM users u\n"
+    "WHERE u.username = ? AND user_inventory.user_id = u.id AND user_inventory.item = ? AND user_inventory.qty >= ?\n"
+    "RETURNING user_id, qty"
+)
+# Everything purchase_store_item needs to price and validate a purchase. Item columns
+# are NULL when the item (or its price row) is missing; tier columns are NULL when no
+# premium tier matches the user's lifetime seconds.
+_SQL_PURCHASE_CONTEXT = (
+    "SELECT u.id, u.active, u.balance_seconds,\n"
+    "  CASE WHEN u.premium_is_lifetime = 1 OR u.premium_until > ? THEN 1 ELSE 0 END,\n"
+    "  t.store_discount_percent, t.stat_cap_percent,\n"
+    "  c.qty, c.restore_energy, c.restore_hunger, c.restore_water, p.current_price_seconds,\n"
+    "  (SELECT market_index_percent FROM time_store_config WHERE id = 1),\n"
+    "  (SELECT z.store_multiplier FROM time_authority_timezones z WHERE z.zone = COALESCE(NULLIF(u.timezone, 0), 12))\n"
+    "FROM users u\n"
+    "LEFT JOIN premium_tiers t ON t.tier = (\n"
+    "  SELECT t2.tier FROM premium_tiers t2 WHERE t2.min_seconds <= u.premium_lifetime_seconds ORDER BY t2.min_seconds DESC LIMIT 1)\n"
+    "LEFT JOIN time_store_catalog c ON c.item = ?\n"
+    "LEFT JOIN time_store_prices p ON p.item = c.item\n"
+    "WHERE u.username = ?"
+)
+# Everything sell_inventory_item needs to validate and price a sale; the held qty and
+# price are NULL when the user has none of the item or the item has no price row
+_SQL_SELL_CONTEXT = (
+    "SELECT u.id, u.active, u.premium_until > ?, ui.qty, p.current_price_seconds,\n"
+    "  (SELECT market_index_percent FROM time_store_config WHERE id = 1)\n"
+    "FROM users u\n"
+    "LEFT JOIN user_inventory ui ON ui.user_id = u.id AND ui.item = ?\n"
+    "LEFT JOIN time_store_prices p ON p.item = ?\n"
+    "WHERE u.username = ?"
+)
+_SQL_CREDIT_USER = "UPDATE users SET balance_seconds = balance_seconds + ? WHERE id = ? RETURNING balance_seconds"
+_SQL_CREDIT_ACTIVE_USER = "UPDATE users SET balance_seconds = balance_seconds + ? WHERE username = ? AND active = 1 RETURNING balance_seconds"
+_SQL_DEBIT_RESERVES = "UPDATE time_reserves SET total_seconds = total_seconds - ? WHERE id = 1 AND total_seconds >= ? RETURNING total_seconds"
+# Share of the effective price paid out when selling back to the store
+SELL_RATE_PERCENT = 75
+SELL_RATE_PERCENT_PREMIUM = 85
+# Stat/purchase charges: guarded on active and balance, so no row back means a guard failed
+_SQL_CHARGE_AND_APPLY_STATS = (
+    "UPDATE users SET balance_seconds = balance_seconds - ?,\n"
+    "energy = MAX(0, MIN(100, energy + ?)), hunger = MAX(0, MIN(100, hunger + ?)), water = MAX(0, MIN(100, water + ?))\n"
+    "WHERE username = ? AND active = 1 AND balance_seconds >= ?\n"
+    "RETURNING balance_seconds, energy, hunger, water"
+)
+_SQL_PURCHASE_CHARGE_APPLY = (
+    "UPDATE users SET balance_seconds = balance_seconds - ?,\n"
+    "energy = MAX(0, MIN(?, energy + ?)), hunger = MAX(0, MIN(?, hunger + ?)), water = MAX(0, MIN(?, water + ?))\n"
+    "WHERE id = ? AND active = 1 AND balance_seconds >= ? RETURNING balance_seconds, energy, hunger, water"
+)
+_SQL_PURCHASE_CHARGE = (
+    "UPDATE users SET balance_seconds = balance_seconds - ? WHERE id = ? AND active = 1 AND balance_seconds >= ?\n"
+    "RETURNING balance_seconds, energy, hunger, water"
+)
+_SQL_TAKE_STOCK = "UPDATE time_store_catalog SET qty = qty - ? WHERE item = ? AND qty >= ? RETURNING qty"
+_SQL_ADD_INVENTORY = (
+    "INSERT INTO user_inventory(user_id, item, qty) VALUES(?,?,?)\n"
+    "ON CONFLICT(user_id, item) DO UPDATE SET qty = qty + excluded.qty"
+)
+_SQL_ADD_INVENTORY_RETURNING = _SQL_ADD_INVENTORY + " RETURNING qty"
+_SQL_TAKE_INVENTORY = "UPDATE user_inventory SET qty = qty - ? WHERE user_id = ? AND item = ? RETURNING qty"
+_SQL_INVENTORY_QTY = "SELECT qty FROM user_inventory WHERE user_id = ? AND item = ?"
+_SQL_USER_ACTIVE = "SELECT active FROM users WHERE username = ?"
+_SQL_USER_ID = "SELECT id FROM users WHERE username = ?"
+# Both sides of a transfer in one lookup; callers key the rows by username
+_SQL_USER_PAIR = "SELECT id, username, balance_seconds, active FROM users WHERE username IN (?, ?)"
+# Move seconds between two users: debit the first id, credit the second
+_SQL_MOVE_SECONDS = (
+    "UPDATE users SET balance_seconds = balance_seconds + CASE id WHEN ? THEN -? WHEN ? THEN ? END\n"
+    "WHERE id IN (?, ?) RETURNING id, balance_seconds"
+)
+# Premium purchase: the first purchase (not currently premium) must be at least 3h;
+# reaching tier 10's threshold unlocks lifetime premium.
+_SQL_PURCHASE_PREMIUM = (
+    "UPDATE users SET balance_seconds = balance_seconds - ?,\n"
+    "  premium_until = MAX(COALESCE(premium_until, 0), ?) + ?,\n"
+    "  premium_lifetime_seconds = premium_lifetime_seconds + ?,\n"
+    "  premium_is_lifetime = CASE WHEN premium_lifetime_seconds + ? >= (SELECT min_seconds FROM premium_tiers WHERE tier = 10)\n"
+    "    THEN 1 ELSE premium_is_lifetime END\n"
+    "WHERE username = ? AND active = 1 AND balance_seconds >= ? AND (COALESCE(premium_until, 0) > ? OR ? >= 10800)\n"
+    "RETURNING balance_seconds, premium_until"
+)
+# Lifetime seconds writes; the tier 10 threshold is read in the same statement so the
+# flag always matches the tiers table, never a cached copy
+_SQL_SET_PREMIUM_LIFETIME = (
+    "UPDATE users SET premium_lifetime_seconds = ?,\n"
+    "  premium_is_lifetime = CASE WHEN ? >= (SELECT min_seconds FROM premium_tiers WHERE tier = 10) THEN 1 ELSE 0 END\n"
+    "WHERE username = ?"
+)
+_SQL_ADD_PREMIUM_LIFETIME = (
+    "UPDATE users SET premium_lifetime_seconds = premium_lifetime_seconds + ?,\n"
+    "  premium_is_lifetime = CASE WHEN premium_lifetime_seconds + ? >= (SELECT min_seconds FROM premium_tiers WHERE tier = 10 AND min_seconds > 0)\n"
+    "    THEN 1 ELSE premium_is_lifetime END\n"
+    "WHERE username = ? RETURNING premium_lifetime_seconds, premium_is_lifetime"
+)
+_SQL_UPSERT_STORE_PRICE = (
+    "INSERT INTO time_store_prices(item, base_price_seconds, current_price_seconds, updated_at) VALUES (?, ?, ?, ?)\n"
+    "ON CONFLICT(item) DO UPDATE SET base_price_seconds = excluded.base_price_seconds, updated_at = excluded.updated_at"
+)
+_SQL_DEACTIVATE_ZERO = "UPDATE users SET active = 0, deactivated_at = COALESCE(deactivated_at, ?) WHERE active = 1 AND balance_seconds <= 0"
+
+# Small, rarely-changing lookup tables are memoized per db path. Writers in this
+# process invalidate immediately; the TTL bounds staleness from other processes.
+_LOOKUP_CACHE_TTL = 30.0
+_STAKE_TIERS_CACHE: Dict[str, Tuple[float, List[int], List[float]]] = {}
+_PREMIUM_TIERS_CACHE: Dict[str, Tuple[float, List[int], List[int], List[tuple]]] = {}
+
+# Paths whose schema/migrations already ran in this process (see _ensure_all)
+_SCHEMA_READY: set = set()
+_SCHEMA_LOCK = threading.Lock()
+
+# Idle read-only connections kept per db path (see _Pool)
+POOL_READERS = 4
+_POOLS: Dict[str, "_Pool"] = {}
+_POOLS_LOCK = threading.Lock()
+
 
 def _ensure_parent(path: Path) -> None:
     if path.parent and not path.parent.exists():
         path.parent.mkdir(parents=True, exist_ok=True)
 
 
-@contextmanager
-def connect(db_path: Path):
-    _ensure_parent(db_path)
-    conn = sqlite3.connect(str(db_path))
+def _open(db_path: Path, row_factory: bool = True, readonly: bool = False) -> sqlite3.Connection:
+    # Autocommit mode: transactions are only the explicit BEGIN/COMMIT pairs below,
+    # so reads never open an implicit transaction and BEGIN IMMEDIATE never collides
+    # with one the sqlite3 module started behind our back.
+    if readonly:
+        target, uri = Path(db_path).resolve().as_uri() + "?mode=ro", True
+    else:
+        _ensure_parent(db_path)
+        target, uri = str(db_path), False
+    conn = sqlite3.connect(
+        target, uri=uri, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None,
+        cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False,
+    )
     try:
-        conn.row_factory = sqlite3.Row
-        yield conn
-    finally:
+        if row_factory:
+            conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        if not readonly:
+            _ensure_schema(conn, str(db_path))
+    except Exception:
         conn.close()
+        raise
+    return conn
+
+
+def _ensure_schema(conn: sqlite3.Connection, key: str) -> None:
+    if key not in _SCHEMA_READY:
+        with _SCHEMA_LOCK:
+            if key not in _SCHEMA_READY:
+                _ensure_all(conn)
+                _SCHEMA_READY.add(key)
+
+
+class _Pool:
+    """Reusable connections for one database path.
+
+    writer() hands out the cached read-write connection, or a spare one while it is
+    checked out (e.g. by a nested call); reader() round-robins up to POOL_READERS
+    read-only connections. Checkouts are exclusive, so callers keep owning their
+    BEGIN/COMMIT, and SQLite's write lock still serializes writers across processes.
+
+    Connections run in autocommit mode (isolation_level=None): reads and
+    single-statement writes run as their own implicit transaction, while any
+    multi-statement write wraps itself in BEGIN IMMEDIATE ... COMMIT so it takes
+    the write lock up front instead of upgrading mid-transaction.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self.pid = os.getpid()
+        self._writers: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=1)
+        self._readers: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=POOL_READERS)
+
+    @contextmanager
+    def writer(self, row_factory: bool = True):
+        with self._checkout(self._writers, row_factory, readonly=False) as conn:
+            yield conn
+
+    @contextmanager
+    def reader(self, row_factory: bool = True):
+        if str(self.db_path) not in _SCHEMA_READY:
+            # The database may not exist yet; a writer creates and migrates it
+            with self.writer():
+                pass
+        with self._checkout(self._readers, row_factory, readonly=True) as conn:
+            yield conn
+
+    @contextmanager
+    def _checkout(self, idle: "queue.Queue[sqlite3.Connection]", row_factory: bool, readonly: bool):
+        try:
+            conn = idle.get_nowait()
+        except queue.Empty:
+            conn = _open(self.db_path, readonly=readonly)
+        try:
+            if not readonly:
+                _ensure_schema(conn, str(self.db_path))
+            conn.row_factory = sqlite3.Row if row_factory else None
+            yield conn
+        finally:
+            self._checkin(idle, conn)
+
+    @staticmethod
+    def _checkin(idle: "queue.Queue[sqlite3.Connection]", conn: sqlite3.Connection) -> None:
+        try:
+            if conn.in_transaction:
+                # Caller returned or raised without COMMIT/ROLLBACK; never hand out an open txn
+                conn.rollback()
+            idle.put_nowait(conn)
+        except (sqlite3.Error, queue.Full):
+            conn.close()
+
+    def close(self) -> None:
+        for idle in (self._writers, self._readers):
+            while True:
+                try:
+                    conn = idle.get_nowait()
+                except queue.Empty:
+                    break
+                if idle is self._writers:
+                    # Refresh planner statistics for the queries this process ran
+                    try:
+                        conn.execute("PRAGMA optimize")
+                    except sqlite3.Error:
+                        pass
+                conn.close()
+
+
+def _pool(db_path: Path) -> _Pool:
+    key = str(db_path)
+    pool = _POOLS.get(key)
+    if pool is None or pool.pid != os.getpid():
+        with _POOLS_LOCK:
+            pool = _POOLS.get(key)
+            if pool is None or pool.pid != os.getpid():
+                pool = _POOLS[key] = _Pool(db_path)
+    return pool
+
+
+@atexit.register
+def close_pools() -> None:
+    """Close every pooled connection (also run at interpreter exit)."""
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        if pool.pid == os.getpid():
+            pool.close()
+
+
+@contextmanager
+def connect(db_path: Path, row_factory: bool = True, readonly: bool = False):
+    """Check out a pooled connection to db_path. Rows are sqlite3.Row unless
+    row_factory=False, which leaves plain tuples for callers that only index
+    positionally. readonly=True uses a read-only connection for pure reads.
+    """
+    pool = _pool(db_path)
+    with (pool.reader if readonly else pool.writer)(row_factory) as conn:
+        yield conn
+
+
+def _ensure_all(conn: sqlite3.Connection) -> None:
+    """Create the base schema and run every _ensure_* migration once.
+    Called lazily on the first connect() per db path, so read helpers can skip the checks.
+    """
+    conn.executescript(SCHEMA_SQL)
+    # One transaction for the migrations instead of a commit per statement
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        _ensure_stats(conn)
+        _ensure_premium(conn)
+        _ensure_premium_tiers(conn)
+        _ensure_premium_daily(conn)
+        _ensure_users_timezone(conn)
+        _ensure_timezones(conn)
+        seed_timezones_defaults(conn)
+        _ensure_reserves(conn)
+        _ensure_store_catalog(conn)
+        _ensure_store_prices(conn)
+        _ensure_store_config(conn)
+        _ensure_user_inventory(conn)
+        _ensure_earner_config(conn)
+        _ensure_earner_promo_config(conn)
+        _ensure_earner_default_config(conn)
+        _ensure_earner_stake_config(conn)
+        _ensure_earner_stake_tiers(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
 
 
 def init_db(db_path: Path) -> None:
+    # Force a full schema pass even if this process already migrated the path
+    _SCHEMA_READY.discard(str(db_path))
     with connect(db_path) as conn:
-        conn.executescript(SCHEMA_SQL)
-        conn.commit()
+        # Seed planner statistics for every table (sampled, so it stays quick on
+        # large databases); PRAGMA optimize at pool shutdown keeps them current
+        conn.execute("PRAGMA analysis_limit = 400")
+        conn.execute("ANALYZE")
 
 
 # New separated configs
@@ -71,11 +432,10 @@ def _ensure_earner_promo_config(conn: sqlite3.Connection) -> None:
         """
     )
     conn.execute("INSERT OR IGNORE INTO time_earner_promo_config(id) VALUES (1)")
-    conn.execute("UPDATE time_earner_promo_config SET base_percent = COALESCE(base_percent, 0.10) WHERE id = 1")
-    conn.execute("UPDATE time_earner_promo_config SET per_block_percent = COALESCE(per_block_percent, 0.0125) WHERE id = 1")
-    conn.execute("UPDATE time_earner_promo_config SET min_seconds = COALESCE(min_seconds, 600) WHERE id = 1")
-    conn.execute("UPDATE time_earner_promo_config SET block_seconds = COALESCE(block_seconds, 600) WHERE id = 1")
-    conn.execute("UPDATE time_earner_promo_config SET promo_enabled = COALESCE(promo_enabled, 1) WHERE id = 1")
+    conn.execute(
+        "UPDATE time_earner_promo_config SET base_percent = COALESCE(base_percent, 0.10), per_block_percent = COALESCE(per_block_percent, 0.0125),\n"
+        "min_seconds = COALESCE(min_seconds, 600), block_seconds = COALESCE(block_seconds, 600), promo_enabled = COALESCE(promo_enabled, 1) WHERE id = 1"
+    )
 
 
 # ---- Time Earner staking tiers ----
@@ -90,119 +450,161 @@ def _ensure_earner_stake_tiers(conn: sqlite3.Connection) -> None:
     )
 
 
+# Balanced progression up to 10x
+_DEFAULT_STAKE_TIERS: List[Tuple[int, float]] = [
+    (2*3600, 1.5),
+    (6*3600, 2.0),
+    (12*3600, 2.75),
+    (24*3600, 4.0),
+    (36*3600, 5.0),
+    (48*3600, 6.0),
+    (72*3600, 7.5),
+    (96*3600, 8.5),
+    (120*3600, 9.25),
+    (144*3600, 10.0),
+]
+# Default seeds are written as one multi-row statement each, built once at import
+_SQL_SEED_STAKE_TIERS = (
+    "INSERT INTO time_earner_stake_tiers(min_seconds, multiplier) VALUES "
+    + ",".join(["(?, ?)"] * len(_DEFAULT_STAKE_TIERS))
+    + "\nON CONFLICT(min_seconds) DO UPDATE SET multiplier=excluded.multiplier"
+)
+_SQL_PRUNE_STAKE_TIERS = f"DELETE FROM time_earner_stake_tiers WHERE min_seconds NOT IN ({','.join('?' * len(_DEFAULT_STAKE_TIERS))})"
+
+
 def seed_stake_tiers_balanced_defaults(conn: sqlite3.Connection) -> None:
-    # Balanced progression up to 10x
-    tiers = [
-        (2*3600, 1.5),
-        (6*3600, 2.0),
-        (12*3600, 2.75),
-        (24*3600, 4.0),
-        (36*3600, 5.0),
-        (48*3600, 6.0),
-        (72*3600, 7.5),
-        (96*3600, 8.5),
-        (120*3600, 9.25),
-        (144*3600, 10.0),
-    ]
-    conn.execute("DELETE FROM time_earner_stake_tiers")
-    conn.executemany(
-        "INSERT INTO time_earner_stake_tiers(min_seconds, multiplier) VALUES (?, ?)", tiers
-    )
+    # Upsert in place and prune leftovers, so the table is never empty mid-transaction
+    conn.execute(_SQL_SEED_STAKE_TIERS, [v for t in _DEFAULT_STAKE_TIERS for v in t])
+    conn.execute(_SQL_PRUNE_STAKE_TIERS, [t[0] for t in _DEFAULT_STAKE_TIERS])
+
+
+def _stake_tiers_cached(db_path: Path) -> Tuple[float, List[int], List[float]]:
+    """Return (loaded_at, sorted min_seconds, multipliers) for the stake tiers table."""
+    key = str(db_path)
+    now = time.monotonic()
+    hit = _STAKE_TIERS_CACHE.get(key)
+    if hit and now - hit[0] < _LOOKUP_CACHE_TTL:
+        return hit
+    with connect(db_path, row_factory=False, readonly=True) as conn:
+        rows = conn.execute(
+            "SELECT min_seconds, multiplier FROM time_earner_stake_tiers ORDER BY min_seconds ASC"
+        ).fetchall()
+    entry = (now, [int(r[0]) for r in rows], [float(r[1]) for r in rows])
+    _STAKE_TIERS_CACHE[key] = entry
+    return entry
+
+
+def _invalidate_stake_tiers(db_path: Path) -> None:
+    _STAKE_TIERS_CACHE.pop(str(db_path), None)
 
 
 def list_earner_stake_tiers(db_path: Path) -> List[Dict[str, Any]]:
-    with connect(db_path) as conn:
-        _ensure_earner_stake_tiers(conn)
+    _, mins, mults = _stake_tiers_cached(db_path)
+    return [
+        {"min_seconds": m, "multiplier": x}
+        for m, x in zip(mins, mults)
+    ]
+
+def _premium_tiers_cached(db_path: Path) -> Tuple[float, List[int], List[int], List[tuple]]:
+    """Return (loaded_at, sorted min_seconds, tiers, full rows) for the premium tiers table."""
+    key = str(db_path)
+    now = time.monotonic()
+    hit = _PREMIUM_TIERS_CACHE.get(key)
+    if hit and now - hit[0] < _LOOKUP_CACHE_TTL:
+        return hit
+    with connect(db_path, row_factory=False, readonly=True) as conn:
         rows = conn.execute(
-            "SELECT min_seconds, multiplier FROM time_earner_stake_tiers ORDER BY min_seconds ASC"
+            "SELECT tier, min_seconds, earn_bonus_percent, store_discount_percent, stat_cap_percent FROM premium_tiers ORDER BY min_seconds ASC, tier ASC"
         ).fetchall()
-        return [
-            {"min_seconds": int(r[0]), "multiplier": float(r[1])}
-            for r in rows
-        ]
+    entry = (now, [int(r[1]) for r in rows], [int(r[0]) for r in rows], rows)
+    _PREMIUM_TIERS_CACHE[key] = entry
+    return entry
+
+
+def _invalidate_premium_tiers(db_path: Path) -> None:
+    _PREMIUM_TIERS_CACHE.pop(str(db_path), None)
+
+
+def _premium_tier_for(db_path: Path, lifetime_seconds: int) -> Optional[tuple]:
+    """Highest premium tier row reached with lifetime_seconds, served from the tiers cache."""
+    _, mins, _, rows = _premium_tiers_cached(db_path)
+    i = bisect.bisect_right(mins, int(lifetime_seconds))
+    return rows[i - 1] if i > 0 else None
+
 
 def get_user_premium_progress(db_path: Path, username: str) -> Dict[str, Any]:
     """Return user's premium progression info.
     Output: {lifetime_seconds, current_tier, next_tier, current_min_seconds, next_min_seconds, to_next_seconds, percent_to_next}
     If at max tier or lifetime, next_* will be None and percent_to_next=100.0
     """
-    with connect(db_path) as conn:
-        _ensure_premium(conn)
-        _ensure_premium_tiers(conn)
+    with connect(db_path, row_factory=False, readonly=True) as conn:
         u = conn.execute("SELECT premium_lifetime_seconds, premium_is_lifetime FROM users WHERE username = ?", (username,)).fetchone()
         if not u:
             return {"success": False, "message": "User not found"}
-        life = int(u[0] or 0)
-        is_life = bool(int(u[1] or 0))
-        rows = conn.execute("SELECT tier, min_seconds FROM premium_tiers ORDER BY tier ASC").fetchall()
-        if not rows:
-            return {"success": True, "lifetime_seconds": life, "current_tier": 0, "next_tier": None, "current_min_seconds": 0, "next_min_seconds": None, "to_next_seconds": None, "percent_to_next": 0.0, "is_lifetime": is_life}
-        current_tier = 0
-        current_min = 0
-        next_tier = None
-        next_min = None
-        for idx, r in enumerate(rows):
-            t = int(r[0]); m = int(r[1])
-            if life >= m:
-                current_tier = t
-                current_min = m
-                # continue to possibly higher tier
-            else:
-                next_tier = t
-                next_min = m
-                break
-        if next_tier is None:
-            # at or above highest tier
-            return {"success": True, "lifetime_seconds": life, "current_tier": current_tier, "next_tier": None, "current_min_seconds": current_min, "next_min_seconds": None, "to_next_seconds": None, "percent_to_next": 100.0, "is_lifetime": is_life}
-        denom = max(1, next_min - current_min)
-        done = max(0, life - current_min)
-        pct = max(0.0, min(100.0, (float(done) / float(denom)) * 100.0))
-        to_next = max(0, next_min - life)
-        return {"success": True, "lifetime_seconds": life, "current_tier": current_tier, "next_tier": next_tier, "current_min_seconds": current_min, "next_min_seconds": next_min, "to_next_seconds": to_next, "percent_to_next": pct, "is_lifetime": is_life}
+    life = int(u[0] or 0)
+    is_life = bool(int(u[1] or 0))
+    _, mins, tiers, _ = _premium_tiers_cached(db_path)
+    if not mins:
+        return {"success": True, "lifetime_seconds": life, "current_tier": 0, "next_tier": None, "current_min_seconds": 0, "next_min_seconds": None, "to_next_seconds": None, "percent_to_next": 0.0, "is_lifetime": is_life}
+    # i = number of tiers already reached; mins[i] (if any) is the next threshold
+    i = bisect.bisect_right(mins, life)
+    current_tier = tiers[i - 1] if i > 0 else 0
+    current_min = mins[i - 1] if i > 0 else 0
+    if is_life or i >= len(mins):
+        # lifetime members and users at/above the highest tier have nothing left to progress
+        return {"success": True, "lifetime_seconds": life, "current_tier": current_tier, "next_tier": None, "current_min_seconds": current_min, "next_min_seconds": None, "to_next_seconds": None, "percent_to_next": 100.0, "is_lifetime": is_life}
+    next_tier = tiers[i]
+    next_min = mins[i]
+    denom = max(1, next_min - current_min)
+    done = max(0, life - current_min)
+    # Integer basis points (1/100 of a percent); done < denom here since life < next_min
+    pct = min(10000, done * 10000 // denom) / 100.0
+    to_next = max(0, next_min - life)
+    return {"success": True, "lifetime_seconds": life, "current_tier": current_tier, "next_tier": next_tier, "current_min_seconds": current_min, "next_min_seconds": next_min, "to_next_seconds": to_next, "percent_to_next": pct, "is_lifetime": is_life}
 
 
 def set_earner_stake_tiers_defaults(db_path: Path) -> None:
     with connect(db_path) as conn:
-        _ensure_earner_stake_tiers(conn)
+        conn.execute("BEGIN IMMEDIATE")
         seed_stake_tiers_balanced_defaults(conn)
         conn.commit()
+    _invalidate_stake_tiers(db_path)
 
 
 def add_earner_stake_tier(db_path: Path, min_seconds: int, multiplier: float) -> None:
     with connect(db_path) as conn:
-        _ensure_earner_stake_tiers(conn)
+        conn.execute("BEGIN IMMEDIATE")
         conn.execute(
             "INSERT OR REPLACE INTO time_earner_stake_tiers(min_seconds, multiplier) VALUES (?, ?)",
             (int(min_seconds), float(multiplier)),
         )
         conn.commit()
+    _invalidate_stake_tiers(db_path)
 
 
 def remove_earner_stake_tier(db_path: Path, min_seconds: int) -> bool:
     with connect(db_path) as conn:
-        _ensure_earner_stake_tiers(conn)
+        conn.execute("BEGIN IMMEDIATE")
         cur = conn.execute(
             "DELETE FROM time_earner_stake_tiers WHERE min_seconds = ?", (int(min_seconds),)
         )
         conn.commit()
-        return (cur.rowcount or 0) > 0
+    _invalidate_stake_tiers(db_path)
+    return (cur.rowcount or 0) > 0
 
 
 def clear_earner_stake_tiers(db_path: Path) -> None:
     with connect(db_path) as conn:
-        _ensure_earner_stake_tiers(conn)
+        conn.execute("BEGIN IMMEDIATE")
         conn.execute("DELETE FROM time_earner_stake_tiers")
         conn.commit()
+    _invalidate_stake_tiers(db_path)
 
 
 def get_multiplier_for_stake(db_path: Path, stake_seconds: int) -> Optional[float]:
-    with connect(db_path) as conn:
-        _ensure_earner_stake_tiers(conn)
-        row = conn.execute(
-            "SELECT multiplier FROM time_earner_stake_tiers WHERE min_seconds <= ? ORDER BY min_seconds DESC LIMIT 1",
-            (int(stake_seconds),),
-        ).fetchone()
-        return float(row[0]) if row else None
+    _, mins, mults = _stake_tiers_cached(db_path)
+    i = bisect.bisect_right(mins, int(stake_seconds)) - 1
+    return mults[i] if i >= 0 else None
 
 
 def _ensure_earner_default_config(conn: sqlite3.Connection) -> None:
@@ -218,15 +620,14 @@ def _ensure_earner_default_config(conn: sqlite3.Connection) -> None:
         """
     )
     conn.execute("INSERT OR IGNORE INTO time_earner_default_config(id) VALUES (1)")
-    conn.execute("UPDATE time_earner_default_config SET base_percent = COALESCE(base_percent, 0.10) WHERE id = 1")
-    conn.execute("UPDATE time_earner_default_config SET per_block_percent = COALESCE(per_block_percent, 0.0125) WHERE id = 1")
-    conn.execute("UPDATE time_earner_default_config SET min_seconds = COALESCE(min_seconds, 600) WHERE id = 1")
-    conn.execute("UPDATE time_earner_default_config SET block_seconds = COALESCE(block_seconds, 600) WHERE id = 1")
+    conn.execute(
+        "UPDATE time_earner_default_config SET base_percent = COALESCE(base_percent, 0.10), per_block_percent = COALESCE(per_block_percent, 0.0125),\n"
+        "min_seconds = COALESCE(min_seconds, 600), block_seconds = COALESCE(block_seconds, 600) WHERE id = 1"
+    )
 
 
 def get_earner_default_config(db_path: Path) -> Dict[str, float | int]:
-    with connect(db_path) as conn:
-        _ensure_earner_default_config(conn)
+    with connect(db_path, row_factory=False, readonly=True) as conn:
         row = conn.execute(
             "SELECT base_percent, per_block_percent, min_seconds, block_seconds FROM time_earner_default_config WHERE id = 1"
         ).fetchone()
@@ -241,7 +642,7 @@ def get_earner_default_config(db_path: Path) -> Dict[str, float | int]:
 def set_earner_default_config(db_path: Path, base_percent: float, per_block_percent: float, min_seconds: int, block_seconds: int) -> None:
     b = float(base_percent); p = float(per_block_percent); mn = int(max(1, min_seconds)); bs = int(max(1, block_seconds))
     with connect(db_path) as conn:
-        _ensure_earner_default_config(conn)
+        conn.execute("BEGIN IMMEDIATE")
         conn.execute(
             "INSERT INTO time_earner_default_config(id, base_percent, per_block_percent, min_seconds, block_seconds) VALUES (1, ?, ?, ?, ?)\n"
             "ON CONFLICT(id) DO UPDATE SET base_percent=excluded.base_percent, per_block_percent=excluded.per_block_percent, min_seconds=excluded.min_seconds, block_seconds=excluded.block_seconds",
@@ -250,30 +651,6 @@ def set_earner_default_config(db_path: Path, base_percent: float, per_block_perc
         conn.commit()
 
 
-def get_earner_promo_config(db_path: Path) -> Dict[str, float | int]:
-    """Override to prefer separated promo config if present; fallback to legacy table."""
-    with connect(db_path) as conn:
-        # Try new table
-        try:
-            cols = {row[1] for row in conn.execute("PRAGMA table_info(time_earner_promo_config)").fetchall()}
-            if cols:
-                _ensure_earner_promo_config(conn)
-                row = conn.execute(
-                    "SELECT base_percent, per_block_percent, min_seconds, block_seconds, promo_enabled FROM time_earner_promo_config WHERE id = 1"
-                ).fetchone()
-                return {
-                    "base_percent": float(row[0]),
-                    "per_block_percent": float(row[1]),
-                    "min_seconds": int(row[2]),
-                    "block_seconds": int(row[3]),
-                    "promo_enabled": int(row[4]),
-                    # Legacy compatible keys
-                    "default_bonus_percent": 0.10,
-                    "default_per_block_percent": 0.0,
-                }
-        except Exception:
-            pass
-
 # ---- Time Authority (Timezones) ----
 def _ensure_users_timezone(conn: sqlite3.Connection) -> None:
     try:
@@ -296,39 +673,39 @@ def _ensure_timezones(conn: sqlite3.Connection) -> None:
         """
     )
 
+_MO = 30 * 86400
+_Y = 365 * 86400
+_DEFAULT_TIMEZONES: List[Tuple[int, int, float, float, str]] = [
+    # zone, deposit, earn_mul, store_mul, label
+    (1,  20*_Y, 3.00, 10.00, "Zone 1"),   # deposit shown for entry from 2->1
+    (2,  15*_Y, 2.70, 7.50,  "Zone 2"),
+    (3,  10*_Y, 2.40, 5.50,  "Zone 3"),
+    (4,   6*_Y, 2.10, 4.20,  "Zone 4"),
+    (5,   3*_Y, 1.80, 3.30,  "Zone 5"),
+    (6,  18*_MO,1.60, 2.70,  "Zone 6"),
+    (7,  12*_MO,1.45, 2.20,  "Zone 7"),
+    (8,   8*_MO,1.30, 1.80,  "Zone 8"),
+    (9,   4*_MO,1.20, 1.50,  "Zone 9"),
+    (10,  2*_MO,1.10, 1.30,  "Zone 10"),
+    (11,  1*_MO,1.05, 1.15,  "Zone 11"),
+    (12,  0,     1.00, 1.00,  "Zone 12"),
+]
+_SQL_SEED_TIMEZONES = (
+    "INSERT INTO time_authority_timezones(zone, deposit_seconds, earn_multiplier, store_multiplier, label) VALUES "
+    + ",".join(["(?,?,?,?,?)"] * len(_DEFAULT_TIMEZONES))
+)
+
+
 def seed_timezones_defaults(conn: sqlite3.Connection) -> None:
-    D = 86400
-    MO = 30 * D
-    Y = 365 * D
-    defaults = [
-        # zone, deposit, earn_mul, store_mul, label
-        (1,  20*Y, 3.00, 10.00, "Zone 1"),   # deposit shown for entry from 2->1
-        (2,  15*Y, 2.70, 7.50,  "Zone 2"),
-        (3,  10*Y, 2.40, 5.50,  "Zone 3"),
-        (4,   6*Y, 2.10, 4.20,  "Zone 4"),
-        (5,   3*Y, 1.80, 3.30,  "Zone 5"),
-        (6,  18*MO,1.60, 2.70,  "Zone 6"),
-        (7,  12*MO,1.45, 2.20,  "Zone 7"),
-        (8,   8*MO,1.30, 1.80,  "Zone 8"),
-        (9,   4*MO,1.20, 1.50,  "Zone 9"),
-        (10,  2*MO,1.10, 1.30,  "Zone 10"),
-        (11,  1*MO,1.05, 1.15,  "Zone 11"),
-        (12,  0,    1.00, 1.00,  "Zone 12"),
-    ]
-    _ensure_timezones(conn)
     rows = conn.execute("SELECT COUNT(*) FROM time_authority_timezones").fetchone()
     if rows and int(rows[0] or 0) == 12:
         return
     conn.execute("DELETE FROM time_authority_timezones")
-    conn.executemany(
-        "INSERT INTO time_authority_timezones(zone, deposit_seconds, earn_multiplier, store_multiplier, label) VALUES (?,?,?,?,?)",
-        defaults,
-    )
+    conn.execute(_SQL_SEED_TIMEZONES, [v for z in _DEFAULT_TIMEZONES for v in z])
 
 def list_timezones(db_path: Path) -> List[Dict[str, Any]]:
-    with connect(db_path) as conn:
-        _ensure_timezones(conn)
-        seed_timezones_defaults(conn)
+    # Zones are seeded with the schema, so this is a pure read
+    with connect(db_path, row_factory=False, readonly=True) as conn:
         rows = conn.execute(
             "SELECT zone, deposit_seconds, earn_multiplier, store_multiplier, label FROM time_authority_timezones ORDER BY zone ASC"
         ).fetchall()
@@ -345,16 +722,12 @@ def list_timezones(db_path: Path) -> List[Dict[str, Any]]:
 
 def set_timezones_defaults(db_path: Path) -> None:
     with connect(db_path) as conn:
-        _ensure_timezones(conn)
+        conn.execute("BEGIN IMMEDIATE")
         seed_timezones_defaults(conn)
         conn.commit()
 
 def get_user_timezone_info(db_path: Path, username: str) -> Dict[str, Any]:
-    with connect(db_path) as conn:
-        _ensure_users_timezone(conn)
-        _ensure_timezones(conn)
-        # Seed if empty
-        seed_timezones_defaults(conn)
+    with connect(db_path, row_factory=False, readonly=True) as conn:
         u = conn.execute("SELECT id, timezone FROM users WHERE username = ?", (username,)).fetchone()
         if not u:
             return {"success": False, "message": "User not found"}
@@ -384,32 +757,29 @@ def move_up_timezone(db_path: Path, username: str) -> Dict[str, Any]:
     with connect(db_path) as conn:
         try:
             conn.execute("BEGIN IMMEDIATE")
-            _ensure_users_timezone(conn)
-            _ensure_timezones(conn)
-            seed_timezones_defaults(conn)
             u = conn.execute("SELECT id, active, balance_seconds, timezone FROM users WHERE username = ?", (username,)).fetchone()
             if not u:
                 result["message"] = "User not found"; conn.rollback(); return result
-            if not int(u[1]):
+            if not u[1]:
                 result["message"] = "Account is deactivated"; conn.rollback(); return result
-            zone = int(u[3] or 12)
+            zone = u[3] or 12
             if zone <= 1:
                 result["message"] = "Already at highest timezone"; conn.rollback(); return result
             dep_row = conn.execute("SELECT deposit_seconds FROM time_authority_timezones WHERE zone = ?", (zone-1,)).fetchone()
-            deposit = int(dep_row[0]) if dep_row else None
+            deposit = dep_row[0] if dep_row else None
             if deposit is None or deposit <= 0:
                 # allow free move if defined as 0
                 deposit = 0
-            bal = int(u[2] or 0)
+            bal = u[2] or 0
             if bal < deposit:
                 result["message"] = "Insufficient balance for deposit"; conn.rollback(); return result
             # Burn deposit and move up
             if deposit > 0:
-                conn.execute("UPDATE users SET balance_seconds = balance_seconds - ? WHERE id = ?", (deposit, int(u[0])))
-            conn.execute("UPDATE users SET timezone = ? WHERE id = ?", (zone-1, int(u[0])))
-            post = conn.execute("SELECT balance_seconds, timezone FROM users WHERE id = ?", (int(u[0]),)).fetchone()
+                conn.execute("UPDATE users SET balance_seconds = balance_seconds - ? WHERE id = ?", (deposit, u[0]))
+            conn.execute("UPDATE users SET timezone = ? WHERE id = ?", (zone-1, u[0]))
+            post = conn.execute("SELECT balance_seconds, timezone FROM users WHERE id = ?", (u[0],)).fetchone()
             conn.commit()
-            result.update({"success": True, "message": "Moved up timezone", "balance": int(post[0]), "zone": int(post[1]), "deposit": int(deposit)})
+            result.update({"success": True, "message": "Moved up timezone", "balance": post[0], "zone": post[1], "deposit": deposit})
             return result
         except Exception as e:
             try: conn.rollback()
@@ -422,27 +792,24 @@ def move_down_timezone(db_path: Path, username: str) -> Dict[str, Any]:
     with connect(db_path) as conn:
         try:
             conn.execute("BEGIN IMMEDIATE")
-            _ensure_users_timezone(conn)
             u = conn.execute("SELECT id, active, timezone FROM users WHERE username = ?", (username,)).fetchone()
             if not u:
                 result["message"] = "User not found"; conn.rollback(); return result
-            if not int(u[1]):
+            if not u[1]:
                 result["message"] = "Account is deactivated"; conn.rollback(); return result
-            zone = int(u[2] or 12)
+            zone = u[2] or 12
             if zone >= 12:
                 result["message"] = "Already at lowest timezone"; conn.rollback(); return result
-            conn.execute("UPDATE users SET timezone = ? WHERE id = ?", (zone+1, int(u[0])))
-            post = conn.execute("SELECT timezone FROM users WHERE id = ?", (int(u[0]),)).fetchone()
+            conn.execute("UPDATE users SET timezone = ? WHERE id = ?", (zone+1, u[0]))
+            post = conn.execute("SELECT timezone FROM users WHERE id = ?", (u[0],)).fetchone()
             conn.commit()
-            result.update({"success": True, "message": "Moved down timezone", "zone": int(post[0])})
+            result.update({"success": True, "message": "Moved down timezone", "zone": post[0]})
             return result
         except Exception as e:
             try: conn.rollback()
             except Exception: pass
             result["message"] = f"Move down failed: {e}"
             return result
-    # Fallback to legacy combined table
-    return get_earner_promo_config.__wrapped__(db_path)  # type: ignore
 
 
 def set_user_timezone(db_path: Path, target_username: str, zone: int) -> Dict[str, Any]:
@@ -455,14 +822,11 @@ def set_user_timezone(db_path: Path, target_username: str, zone: int) -> Dict[st
     with connect(db_path) as conn:
         try:
             conn.execute("BEGIN IMMEDIATE")
-            _ensure_users_timezone(conn)
-            _ensure_timezones(conn)
-            seed_timezones_defaults(conn)
             u = conn.execute("SELECT id, timezone FROM users WHERE username = ?", (target_username,)).fetchone()
             if not u:
                 result["message"] = "User not found"; conn.rollback(); return result
-            prev = int(u[1] or 12)
-            conn.execute("UPDATE users SET timezone = ? WHERE id = ?", (z, int(u[0])))
+            prev = u[1] or 12
+            conn.execute("UPDATE users SET timezone = ? WHERE id = ?", (z, u[0]))
             conn.commit()
             result.update({"success": True, "message": "Timezone updated", "previous_zone": prev, "zone": z})
             return result
@@ -485,13 +849,13 @@ def _ensure_earner_stake_config(conn: sqlite3.Connection) -> None:
         """
     )
     conn.execute("INSERT OR IGNORE INTO time_earner_stake_config(id) VALUES (1)")
-    conn.execute("UPDATE time_earner_stake_config SET min_stake_seconds = COALESCE(min_stake_seconds, 7200) WHERE id = 1")
-    conn.execute("UPDATE time_earner_stake_config SET reward_multiplier = COALESCE(reward_multiplier, 2.0) WHERE id = 1")
+    conn.execute(
+        "UPDATE time_earner_stake_config SET min_stake_seconds = COALESCE(min_stake_seconds, 7200), reward_multiplier = COALESCE(reward_multiplier, 2.0) WHERE id = 1"
+    )
 
 
 def get_earner_stake_config(db_path: Path) -> Dict[str, float | int]:
-    with connect(db_path) as conn:
-        _ensure_earner_stake_config(conn)
+    with connect(db_path, row_factory=False, readonly=True) as conn:
         row = conn.execute("SELECT min_stake_seconds, reward_multiplier FROM time_earner_stake_config WHERE id = 1").fetchone()
         return {"min_stake_seconds": int(row[0]), "reward_multiplier": float(row[1])}
 
@@ -500,7 +864,7 @@ def set_earner_stake_config(db_path: Path, min_stake_seconds: int, reward_multip
     mn = int(max(1, min_stake_seconds))
     rm = float(reward_multiplier)
     with connect(db_path) as conn:
-        _ensure_earner_stake_config(conn)
+        conn.execute("BEGIN IMMEDIATE")
         conn.execute(
             "INSERT INTO time_earner_stake_config(id, min_stake_seconds, reward_multiplier) VALUES (1, ?, ?)\n"
             "ON CONFLICT(id) DO UPDATE SET min_stake_seconds = excluded.min_stake_seconds, reward_multiplier = excluded.reward_multiplier",
@@ -509,15 +873,17 @@ def set_earner_stake_config(db_path: Path, min_stake_seconds: int, reward_multip
         conn.commit()
 
 def _ensure_reserves(conn: sqlite3.Connection) -> None:
-    conn.executescript(
+    # Plain execute() rather than executescript(): the latter COMMITs first and
+    # would end a caller's BEGIN IMMEDIATE transaction.
+    conn.execute(
         """
         CREATE TABLE IF NOT EXISTS time_reserves (
             id INTEGER PRIMARY KEY CHECK (id = 1),
             total_seconds INTEGER NOT NULL DEFAULT 0
-        );
-        INSERT OR IGNORE INTO time_reserves (id, total_seconds) VALUES (1, 0);
+        )
         """
     )
+    conn.execute("INSERT OR IGNORE INTO time_reserves (id, total_seconds) VALUES (1, 0)")
 
 def _ensure_store_catalog(conn: sqlite3.Connection) -> None:
     conn.execute(
@@ -542,14 +908,13 @@ def _ensure_store_catalog(conn: sqlite3.Connection) -> None:
         conn.execute("ALTER TABLE time_store_catalog ADD COLUMN id INTEGER")
         # Create a unique index to enforce uniqueness when ids are assigned
         conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_time_store_catalog_id ON time_store_catalog(id)")
-        # Backfill ids for existing rows with NULL id
-        rows = conn.execute("SELECT item FROM time_store_catalog WHERE id IS NULL ORDER BY item ASC").fetchall()
-        if rows:
-            max_row = conn.execute("SELECT COALESCE(MAX(id), 0) FROM time_store_catalog").fetchone()
-            next_id = int(max_row[0]) if max_row and max_row[0] is not None else 0
-            for r in rows:
-                next_id += 1
-                conn.execute("UPDATE time_store_catalog SET id = ? WHERE item = ?", (next_id, r[0]))
+        # Backfill ids for existing rows with NULL id, numbered by item after the current max
+        conn.execute(
+            "UPDATE time_store_catalog SET id = r.new_id FROM (\n"
+            "  SELECT item, (SELECT COALESCE(MAX(id), 0) FROM time_store_catalog) + ROW_NUMBER() OVER (ORDER BY item) AS new_id\n"
+            "  FROM time_store_catalog WHERE id IS NULL\n"
+            ") AS r WHERE time_store_catalog.item = r.item"
+        )
     else:
         # Ensure the unique index exists even if column already present
         conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_time_store_catalog_id ON time_store_catalog(id)")
@@ -600,6 +965,8 @@ def _ensure_premium_tiers(conn: sqlite3.Connection) -> None:
         )
         """
     )
+    # Tier-by-lifetime lookups (ORDER BY min_seconds DESC LIMIT 1) walk this instead of sorting
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_premium_tiers_min_seconds ON premium_tiers(min_seconds)")
     # Seed defaults if empty
     try:
         row = conn.execute("SELECT COUNT(*) FROM premium_tiers").fetchone()
@@ -609,39 +976,32 @@ def _ensure_premium_tiers(conn: sqlite3.Connection) -> None:
         # If the table is not accessible for some reason, ignore seeding
         pass
 
-def seed_premium_tiers_defaults(conn: sqlite3.Connection) -> None:
-    # Thresholds cumulative: 1h, 1d, 1w, 1mo, 3mo, 6mo, 1y, 2y, 3y, 5y
-    H = 3600
-    D = 86400
-    W = 7 * D
-    MO = 30 * D
-    Y = 365 * D
-    tiers = [
-        (1, 1*H,    0.05, 0.05, 150),
-        (2, 1*D,    0.08, 0.08, 175),
-        (3, 1*W,    0.10, 0.10, 200),
-        (4, 1*MO,   0.12, 0.12, 225),
-        (5, 3*MO,   0.15, 0.15, 250),
-        (6, 6*MO,   0.18, 0.18, 300),
-        (7, 1*Y,    0.21, 0.21, 350),
-        (8, 2*Y,    0.24, 0.24, 400),
-        (9, 3*Y,    0.27, 0.27, 450),
-        (10, 5*Y,   0.30, 0.30, 500),
-    ]
-    _ensure_premium_tiers(conn)
-    conn.execute("DELETE FROM premium_tiers")
-    conn.executemany(
-        "INSERT INTO premium_tiers(tier, min_seconds, earn_bonus_percent, store_discount_percent, stat_cap_percent) VALUES (?,?,?,?,?)",
-        tiers,
-    )
+# Thresholds cumulative: 1h, 1d, 1w, 1mo, 3mo, 6mo, 1y, 2y, 3y, 5y
+_DEFAULT_PREMIUM_TIERS: List[Tuple[int, int, float, float, int]] = [
+    (1, 3600,       0.05, 0.05, 150),
+    (2, 86400,      0.08, 0.08, 175),
+    (3, 7 * 86400,  0.10, 0.10, 200),
+    (4, 1*_MO,      0.12, 0.12, 225),
+    (5, 3*_MO,      0.15, 0.15, 250),
+    (6, 6*_MO,      0.18, 0.18, 300),
+    (7, 1*_Y,       0.21, 0.21, 350),
+    (8, 2*_Y,       0.24, 0.24, 400),
+    (9, 3*_Y,       0.27, 0.27, 450),
+    (10, 5*_Y,      0.30, 0.30, 500),
+]
+_SQL_SEED_PREMIUM_TIERS = (
+    "INSERT INTO premium_tiers(tier, min_seconds, earn_bonus_percent, store_discount_percent, stat_cap_percent) VALUES "
+    + ",".join(["(?,?,?,?,?)"] * len(_DEFAULT_PREMIUM_TIERS))
+    + "\nON CONFLICT(tier) DO UPDATE SET min_seconds=excluded.min_seconds, earn_bonus_percent=excluded.earn_bonus_percent, store_discount_percent=excluded.store_discount_percent, stat_cap_percent=excluded.stat_cap_percent"
+)
+_SQL_PRUNE_PREMIUM_TIERS = f"DELETE FROM premium_tiers WHERE tier NOT IN ({','.join('?' * len(_DEFAULT_PREMIUM_TIERS))})"
+
 
-def _get_premium_tier_row(conn: sqlite3.Connection, lifetime_seconds: int) -> Optional[sqlite3.Row]:
-    _ensure_premium_tiers(conn)
-    row = conn.execute(
-        "SELECT tier, min_seconds, earn_bonus_percent, store_discount_percent, stat_cap_percent FROM premium_tiers WHERE min_seconds <= ? ORDER BY min_seconds DESC LIMIT 1",
-        (int(lifetime_seconds),),
-    ).fetchone()
-    return row
+def seed_premium_tiers_defaults(conn: sqlite3.Connection) -> None:
+    # Callers have already created the table; calling _ensure_premium_tiers here
+    # would re-enter this function while the table is still empty.
+    conn.execute(_SQL_SEED_PREMIUM_TIERS, [v for t in _DEFAULT_PREMIUM_TIERS for v in t])
+    conn.execute(_SQL_PRUNE_PREMIUM_TIERS, [t[0] for t in _DEFAULT_PREMIUM_TIERS])
 
 def _ensure_store_prices(conn: sqlite3.Connection) -> None:
     conn.execute(
@@ -666,65 +1026,112 @@ def create_account(db_path: Path, username: str, passcode_hash: str, initial_sec
             """,
             (username, passcode_hash, max(0, int(initial_seconds)), 1 if is_admin else 0, now),
         )
-        conn.commit()
         return int(cur.lastrowid)
 
 
 def find_user(db_path: Path, username: str) -> Optional[sqlite3.Row]:
-    with connect(db_path) as conn:
-        _ensure_stats(conn)
+    with connect(db_path, readonly=True) as conn:
         cur = conn.execute("SELECT * FROM users WHERE username = ?", (username,))
         row = cur.fetchone()
         return row
 
 
-def set_deactivated_if_zero(conn: sqlite3.Connection) -> None:
+def set_deactivated_if_zero(conn: sqlite3.Connection) -> int:
+    """Deactivate active users whose balance reached zero. Returns the number deactivated."""
     now = int(time.time())
-    conn.execute(
-        "UPDATE users SET active = 0, deactivated_at = COALESCE(deactivated_at, ?) WHERE active = 1 AND balance_seconds <= 0",
-        (now,),
-    )
+    cur = conn.execute(_SQL_DEACTIVATE_ZERO, (now,))
+    return cur.rowcount if cur.rowcount is not None else 0
+
+
+def _tick(conn: sqlite3.Connection, seconds: int = 1) -> Tuple[int, int]:
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if seconds == 1:
+            cur = conn.execute(_SQL_TICK_DEDUCT)
+            updated = cur.rowcount if cur.rowcount is not None else 0
+            taken = updated
+        else:
+            taken = conn.execute(_SQL_TICK_DEDUCTIBLE, (seconds,)).fetchone()[0]
+            cur = conn.execute(_SQL_TICK_DEDUCT_N, (seconds,))
+            updated = cur.rowcount if cur.rowcount is not None else 0
+        if taken > 0:
+            # accumulate into time_reserves atomically
+            conn.execute(_SQL_TICK_ACCRUE_RESERVES, (int(taken),))
+        deactivated = set_deactivated_if_zero(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return updated, deactivated
 
 
 def deduct_one_second_all_active(db_path: Path) -> Tuple[int, int]:
     """Deduct one second from all active users with balance > 0.
     Returns (updated_rows, deactivated_rows).
     """
-    with connect(db_path) as conn:
-        conn.execute("BEGIN IMMEDIATE")
-        _ensure_reserves(conn)
-        cur = conn.execute(
-            "UPDATE users SET balance_seconds = balance_seconds - 1 WHERE active = 1 AND balance_seconds > 0"
-        )
-        updated = cur.rowcount if cur.rowcount is not None else 0
-        if updated > 0:
-            # accumulate into time_reserves atomically
-            conn.execute(
-                "INSERT INTO time_reserves(id, total_seconds) VALUES (1, ?)\n"
-                "ON CONFLICT(id) DO UPDATE SET total_seconds = total_seconds + excluded.total_seconds",
-                (int(updated),),
-            )
-        set_deactivated_if_zero(conn)
-        cur2 = conn.execute("SELECT changes()")
-        deactivated = cur2.fetchone()[0]
-        conn.commit()
-        return updated, deactivated
+    with connect(db_path, row_factory=False) as conn:
+        return _tick(conn)
+
+
+class TickHandle:
+    """Long-lived deduction tick for the worker loop.
+    Keeps one connection open so the tick statements stay prepared in its
+    statement cache instead of being re-parsed on a fresh connection every second.
+    Calling it with seconds=n applies n ticks in one transaction (one commit).
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = _open(db_path, row_factory=False)
+
+    def __call__(self, seconds: int = 1) -> Tuple[int, int]:
+        if self._conn is None:
+            raise sqlite3.ProgrammingError("TickHandle is closed")
+        return _tick(self._conn, max(1, int(seconds)))
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self) -> "TickHandle":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+
+def prepare_tick(db_path: Path) -> TickHandle:
+    """Return a callable that performs deduct_one_second_all_active on a persistent connection."""
+    return TickHandle(db_path)
 
 
 def get_balance_seconds(db_path: Path, username: str) -> Optional[int]:
-    with connect(db_path) as conn:
-        cur = conn.execute("SELECT balance_seconds FROM users WHERE username = ?", (username,))
+    with connect(db_path, row_factory=False, readonly=True) as conn:
+        cur = conn.execute(_SQL_GET_BALANCE, (username,))
         row = cur.fetchone()
-        return int(row[0]) if row else None
+        return row[0] if row else None
 
 
-def list_all_accounts(db_path: Path) -> List[Dict[str, Any]]:
-    with connect(db_path) as conn:
-        _ensure_stats(conn)
+def iter_all_accounts(db_path: Path, limit: Optional[int] = None, offset: int = 0, batch_size: int = 256) -> Iterator[Dict[str, Any]]:
+    """Yield accounts ordered by username, fetching batch_size rows at a time.
+    limit/offset page on the server side (backed by the username UNIQUE index); limit=None means no limit.
+    """
+    with connect(db_path, row_factory=False, readonly=True) as conn:
         cur = conn.execute(
-            "SELECT username, balance_seconds, active, is_admin, created_at, deactivated_at FROM users ORDER BY username ASC"
+            "SELECT username, balance_seconds, active, is_admin, created_at, deactivated_at FROM users ORDER BY username ASC LIMIT ? OFFSET ?",
+            (-1 if limit is None else int(max(0, limit)), int(max(0, offset))),
         )
-        return [dict(r) for r in cur.fetchall()]
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            for (u, b, a, adm, c, d) in rows:
+                yield {"username": u, "balance_seconds": b, "active": a, "is_admin": adm, "created_at": c, "deactivated_at": d}
+
+
+def list_all_accounts(db_path: Path, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+    return list(iter_all_accounts(db_path, limit=limit, offset=offset))
 
 
 def transfer_from_reserves(db_path: Path, to_username: str, amount_seconds: int) -> Dict[str, Any]:
@@ -736,37 +1143,26 @@ def transfer_from_reserves(db_path: Path, to_username: str, amount_seconds: int)
     if amount <= 0:
         result["message"] = "Amount must be greater than zero"
         return result
-    with connect(db_path) as conn:
+    with connect(db_path, row_factory=False) as conn:
         try:
             conn.execute("BEGIN IMMEDIATE")
-            _ensure_reserves(conn)
-            # Fetch reserves and recipient
-            reserves_row = conn.execute("SELECT total_seconds FROM time_reserves WHERE id = 1").fetchone()
-            reserves = int(reserves_row[0]) if reserves_row else 0
-            if reserves < amount:
+            # Both writes are guarded and return the post-transfer values
+            rem_row = conn.execute(_SQL_DEBIT_RESERVES, (amount, amount)).fetchone()
+            if not rem_row:
                 result["message"] = "Insufficient Time Reserves"
                 conn.rollback()
                 return result
-            u = conn.execute("SELECT id, active FROM users WHERE username = ?", (to_username,)).fetchone()
-            if not u:
-                result["message"] = "Recipient user not found"
-                conn.rollback()
-                return result
-            if not int(u["active"]):
-                result["message"] = "Recipient account is deactivated"
+            bal_row = conn.execute(_SQL_CREDIT_ACTIVE_USER, (amount, to_username)).fetchone()
+            if not bal_row:
+                u = conn.execute(_SQL_USER_ACTIVE, (to_username,)).fetchone()
+                result["message"] = "Recipient user not found" if not u else "Recipient account is deactivated"
                 conn.rollback()
                 return result
-            # Apply updates
-            conn.execute("UPDATE users SET balance_seconds = balance_seconds + ? WHERE id = ?", (amount, int(u["id"])))
-            conn.execute("UPDATE time_reserves SET total_seconds = total_seconds - ? WHERE id = 1", (amount,))
-            # Read post state
-            bal_row = conn.execute("SELECT balance_seconds FROM users WHERE id = ?", (int(u["id"]),)).fetchone()
-            rem_row = conn.execute("SELECT total_seconds FROM time_reserves WHERE id = 1").fetchone()
             conn.commit()
             result["success"] = True
             result["message"] = "Transfer from reserves completed"
-            result["to_balance"] = int(bal_row[0]) if bal_row else None
-            result["reserves_remaining"] = int(rem_row[0]) if rem_row else None
+            result["to_balance"] = bal_row[0]
+            result["reserves_remaining"] = rem_row[0]
             return result
         except Exception as e:
             try:
@@ -793,50 +1189,41 @@ def gift_premium(db_path: Path, from_username: str, to_username: str, seconds: i
     with connect(db_path) as conn:
         try:
             conn.execute("BEGIN IMMEDIATE")
-            _ensure_premium(conn)
             g = conn.execute("SELECT id, active, balance_seconds FROM users WHERE username = ?", (from_username,)).fetchone()
             r = conn.execute("SELECT id, active, premium_until FROM users WHERE username = ?", (to_username,)).fetchone()
             if not g:
                 res["message"] = "Giver not found"; conn.rollback(); return res
             if not r:
                 res["message"] = "Recipient not found"; conn.rollback(); return res
-            if not int(g[1]):
+            if not g[1]:
                 res["message"] = "Giver account is deactivated"; conn.rollback(); return res
-            if not int(r[1]):
+            if not r[1]:
                 res["message"] = "Recipient account is deactivated"; conn.rollback(); return res
-            import time as _t
-            now = int(_t.time())
-            r_active = int(r[2] or 0) > now
+            now = int(time.time())
+            r_active = r[2] > now
             if not r_active and secs < 10800:
                 res["message"] = "Minimum 3h for first Premium for recipient"; conn.rollback(); return res
             cost = secs * 3
-            if int(g[2]) < cost:
+            # Deduct from giver; the balance guard makes the check and debit one statement
+            nb = conn.execute(
+                "UPDATE users SET balance_seconds = balance_seconds - ? WHERE id = ? AND balance_seconds >= ? RETURNING balance_seconds",
+                (cost, g[0], cost)
+            ).fetchone()
+            if not nb:
                 res["message"] = "Insufficient balance"; conn.rollback(); return res
-            # Deduct from giver
-            conn.execute("UPDATE users SET balance_seconds = balance_seconds - ? WHERE id = ?", (cost, int(g[0])))
-            # Extend recipient premium
-            base = int(r[2] or 0)
+            # Extend recipient premium, add to lifetime accumulation per spec,
+            # and unlock lifetime once the tier 10 threshold is met
+            base = r[2]
             start = base if base > now else now
             new_until = start + secs
-            conn.execute("UPDATE users SET premium_until = ? WHERE id = ?", (new_until, int(r[0])))
-            # Increment recipient's lifetime accumulation per spec
-            conn.execute(
-                "UPDATE users SET premium_lifetime_seconds = premium_lifetime_seconds + ? WHERE id = ?",
-                (secs, int(r[0]))
-            )
-            # Unlock lifetime for recipient if threshold met
-            try:
-                thr = conn.execute("SELECT min_seconds FROM premium_tiers WHERE tier = 10").fetchone()
-                if thr:
-                    min10 = int(thr[0])
-                    cur_lt = conn.execute("SELECT premium_lifetime_seconds FROM users WHERE id = ?", (int(r[0]),)).fetchone()
-                    if cur_lt and int(cur_lt[0] or 0) >= min10:
-                        conn.execute("UPDATE users SET premium_is_lifetime = 1 WHERE id = ?", (int(r[0]),))
-            except Exception:
-                pass
-            nb = conn.execute("SELECT balance_seconds FROM users WHERE id = ?", (int(g[0]),)).fetchone()[0]
+            up = conn.execute(
+                "UPDATE users SET premium_until = ?, premium_lifetime_seconds = premium_lifetime_seconds + ?,\n"
+                "premium_is_lifetime = CASE WHEN premium_lifetime_seconds + ? >= (SELECT min_seconds FROM premium_tiers WHERE tier = 10) THEN 1 ELSE premium_is_lifetime END\n"
+                "WHERE id = ? RETURNING premium_until",
+                (new_until, secs, secs, r[0])
+            ).fetchone()
             conn.commit()
-            return {"success": True, "message": "Premium gifted", "from_balance": int(nb), "to_premium_until": int(new_until), "cost": int(cost)}
+            return {"success": True, "message": "Premium gifted", "from_balance": nb[0], "to_premium_until": up[0], "cost": cost}
         except Exception as e:
             try: conn.rollback()
             except Exception: pass
@@ -859,11 +1246,12 @@ def distribute_reserves_equal(db_path: Path, amount_seconds: Optional[int] = Non
     with connect(db_path) as conn:
         try:
             conn.execute("BEGIN IMMEDIATE")
-            _ensure_reserves(conn)
-            # Get reserves and active user count
-            reserves = int(conn.execute("SELECT total_seconds FROM time_reserves WHERE id = 1").fetchone()[0])
-            cnt_row = conn.execute("SELECT COUNT(*) FROM users WHERE active = 1").fetchone()
-            active_count = int(cnt_row[0]) if cnt_row else 0
+            # Get reserves and active user count in one statement
+            row = conn.execute(
+                "SELECT total_seconds, (SELECT COUNT(*) FROM users WHERE active = 1) FROM time_reserves WHERE id = 1"
+            ).fetchone()
+            reserves = int(row[0])
+            active_count = int(row[1] or 0)
             if active_count <= 0:
                 result["message"] = "No active users to distribute to"
                 conn.rollback()
@@ -887,9 +1275,11 @@ def distribute_reserves_equal(db_path: Path, amount_seconds: Optional[int] = Non
             # Credit all active users equally
             cur = conn.execute("UPDATE users SET balance_seconds = balance_seconds + ? WHERE active = 1", (per,))
             credited = cur.rowcount if cur.rowcount is not None else active_count
-            # Deduct from reserves
-            conn.execute("UPDATE time_reserves SET total_seconds = total_seconds - ? WHERE id = 1", (total_dist,))
-            rem_row = conn.execute("SELECT total_seconds FROM time_reserves WHERE id = 1").fetchone()
+            # Deduct from reserves, reading back the remainder in the same statement
+            rem_row = conn.execute(
+                "UPDATE time_reserves SET total_seconds = total_seconds - ? WHERE id = 1 RETURNING total_seconds",
+                (total_dist,),
+            ).fetchone()
             conn.commit()
             result["success"] = True
             result["message"] = "Distribution completed"
@@ -908,85 +1298,40 @@ def distribute_reserves_equal(db_path: Path, amount_seconds: Optional[int] = Non
 
 
 def get_time_reserves(db_path: Path) -> int:
-    with connect(db_path) as conn:
-        _ensure_reserves(conn)
+    with connect(db_path, row_factory=False, readonly=True) as conn:
         cur = conn.execute("SELECT total_seconds FROM time_reserves WHERE id = 1")
         row = cur.fetchone()
         return int(row[0]) if row else 0
 
 
 def top_accounts(db_path: Path, limit: int = 10) -> List[Dict[str, Any]]:
-    with connect(db_path) as conn:
+    with connect(db_path, row_factory=False, readonly=True) as conn:
         cur = conn.execute(
             "SELECT username, balance_seconds, active FROM users ORDER BY balance_seconds DESC, username ASC LIMIT ?",
             (int(limit),),
         )
-        return [dict(r) for r in cur.fetchall()]
+        return [{"username": u, "balance_seconds": b, "active": a} for (u, b, a) in cur]
 
 
 def get_user_stats(db_path: Path, username: str) -> Optional[Dict[str, int]]:
-    with connect(db_path) as conn:
-        _ensure_stats(conn)
-        _ensure_premium(conn)
+    with connect(db_path, row_factory=False, readonly=True) as conn:
         r = conn.execute("SELECT energy, hunger, water FROM users WHERE username = ?", (username,)).fetchone()
         if not r:
             return None
-        return {"energy": int(r[0]), "hunger": int(r[1]), "water": int(r[2])}
+        return {"energy": r[0], "hunger": r[1], "water": r[2]}
 
 
 def set_user_stats_full(db_path: Path, username: str) -> bool:
-    with connect(db_path) as conn:
-        _ensure_stats(conn)
-        _ensure_premium(conn)
-        _ensure_premium_tiers(conn)
-        # Resolve per-user cap: premium lifetime or active premium uses tier cap; otherwise 100
-        u = conn.execute(
-            "SELECT id, premium_until, premium_is_lifetime, premium_lifetime_seconds FROM users WHERE username = ?",
-            (username,)
-        ).fetchone()
-        if not u:
-            return False
-        import time as _t
-        now_ts = int(_t.time())
-        is_life = int(u[2] or 0) == 1
-        cap = 100
-        if is_life or int(u[1] or 0) > now_ts:
-            row = _get_premium_tier_row(conn, int(u[3] or 0))
-            cap = int(row[4]) if row and int(row[4] or 0) > 0 else 100
-        cur = conn.execute(
-            "UPDATE users SET energy = ?, hunger = ?, water = ? WHERE id = ?",
-            (cap, cap, cap, int(u[0]))
-        )
-        conn.commit()
+    # Cap is resolved in SQL, so this is one statement in autocommit
+    with connect(db_path, row_factory=False) as conn:
+        cur = conn.execute(_SQL_FILL_USER_STATS, (int(time.time()), username))
         return (cur.rowcount or 0) > 0
 
 
 def set_all_users_stats_full(db_path: Path) -> int:
-    with connect(db_path) as conn:
-        _ensure_stats(conn)
-        _ensure_premium(conn)
-        _ensure_premium_tiers(conn)
-        import time as _t
-        now_ts = int(_t.time())
-        # Fetch needed fields to compute caps per user
-        rows = conn.execute(
-            "SELECT id, premium_until, premium_is_lifetime, premium_lifetime_seconds FROM users"
-        ).fetchall()
-        updated = 0
-        for r in rows:
-            uid = int(r[0])
-            is_life = int(r[2] or 0) == 1
-            cap = 100
-            if is_life or int(r[1] or 0) > now_ts:
-                row = _get_premium_tier_row(conn, int(r[3] or 0))
-                cap = int(row[4]) if row and int(row[4] or 0) > 0 else 100
-            cur = conn.execute(
-                "UPDATE users SET energy = ?, hunger = ?, water = ? WHERE id = ?",
-                (cap, cap, cap, uid)
-            )
-            updated += int(cur.rowcount or 0)
-        conn.commit()
-        return updated
+    with connect(db_path, row_factory=False) as conn:
+        cur = conn.execute(_SQL_FILL_ALL_STATS, (int(time.time()),))
+        return int(cur.rowcount or 0)
 
 
 def apply_stat_changes(db_path: Path, username: str, delta_energy: int, delta_hunger: int, delta_water: int) -> Dict[str, Any]:
@@ -994,35 +1339,14 @@ def apply_stat_changes(db_path: Path, username: str, delta_energy: int, delta_hu
     Returns: {success, message, energy, hunger, water}
     """
     out: Dict[str, Any] = {"success": False, "message": ""}
-    with connect(db_path) as conn:
+    with connect(db_path, row_factory=False) as conn:
         try:
-            conn.execute("BEGIN IMMEDIATE")
-            _ensure_stats(conn)
-            _ensure_premium(conn)
-            _ensure_premium_tiers(conn)
-            u = conn.execute("SELECT id, energy, hunger, water, premium_until, premium_is_lifetime, premium_lifetime_seconds FROM users WHERE username = ?", (username,)).fetchone()
-            if not u:
-                conn.rollback(); out["message"] = "User not found"; return out
-            import time as _t
-            now_ts = int(_t.time())
-            upper = 100
-            try:
-                is_life = int(u[5] or 0) == 1
-                if is_life or int(u[4] or 0) > now_ts:
-                    trow = _get_premium_tier_row(conn, int(u[6] or 0))
-                    upper = int(trow[4]) if trow else 250
-            except Exception:
-                upper = 250 if int(u[4] or 0) > now_ts else 100
-            def cap(v: int) -> int:
-                return 0 if v < 0 else (upper if v > upper else v)
-            new_energy = cap(int(u[1]) + int(delta_energy))
-            new_hunger = cap(int(u[2]) + int(delta_hunger))
-            new_water  = cap(int(u[3]) + int(delta_water))
-            conn.execute(
-                "UPDATE users SET energy = ?, hunger = ?, water = ? WHERE id = ?",
-                (new_energy, new_hunger, new_water, int(u[0]))
-            )
-            conn.commit()
+            now_ts = int(time.time())
+            # Single statement (autocommit); no row means no such user
+            row = conn.execute(_SQL_APPLY_STAT_DELTAS, (int(delta_energy), int(delta_hunger), int(delta_water), now_ts, username)).fetchone()
+            if not row:
+                out["message"] = "User not found"; return out
+            new_energy, new_hunger, new_water = row
             out.update({
                 "success": True,
                 "message": "Stats updated",
@@ -1032,8 +1356,6 @@ def apply_stat_changes(db_path: Path, username: str, delta_energy: int, delta_hu
             })
             return out
         except Exception as e:
-            try: conn.rollback()
-            except Exception: pass
             out["message"] = f"Update failed: {e}"
             return out
 
@@ -1043,47 +1365,32 @@ def apply_stat_changes_and_charge(db_path: Path, username: str, delta_energy: in
     """
     result: Dict[str, Any] = {"success": False, "message": ""}
     cost = int(max(0, cost_seconds))
-    with connect(db_path) as conn:
+    with connect(db_path, row_factory=False) as conn:
         try:
-            conn.execute("BEGIN IMMEDIATE")
-            _ensure_stats(conn)
-            u = conn.execute("SELECT id, active, balance_seconds, energy, hunger, water FROM users WHERE username = ?", (username,)).fetchone()
-            if not u:
-                result["message"] = "User not found"
-                conn.rollback(); return result
-            if not int(u["active"]):
-                result["message"] = "Account is deactivated"
-                conn.rollback(); return result
-            bal = int(u["balance_seconds"])
-            if bal < cost:
-                result["message"] = "Insufficient balance"
-                conn.rollback(); return result
-            # Deduct cost
-            conn.execute("UPDATE users SET balance_seconds = balance_seconds - ? WHERE id = ?", (cost, int(u["id"])) )
-            # Apply capped stats
-            def cap(v: int) -> int:
-                return 0 if v < 0 else (100 if v > 100 else v)
-            new_energy = cap(int(u["energy"]) + int(delta_energy))
-            new_hunger = cap(int(u["hunger"]) + int(delta_hunger))
-            new_water  = cap(int(u["water"])  + int(delta_water))
-            conn.execute(
-                "UPDATE users SET energy = ?, hunger = ?, water = ? WHERE id = ?",
-                (new_energy, new_hunger, new_water, int(u["id"]))
-            )
-            row = conn.execute("SELECT balance_seconds, energy, hunger, water FROM users WHERE id = ?", (int(u["id"]),)).fetchone()
-            conn.commit()
+            # Deduct cost and apply capped stats in one statement (autocommit); no row means a guard failed
+            row = conn.execute(
+                _SQL_CHARGE_AND_APPLY_STATS,
+                (cost, int(delta_energy), int(delta_hunger), int(delta_water), username, cost),
+            ).fetchone()
+            if not row:
+                u = conn.execute(_SQL_USER_ACTIVE, (username,)).fetchone()
+                if not u:
+                    result["message"] = "User not found"
+                elif not u[0]:
+                    result["message"] = "Account is deactivated"
+                else:
+                    result["message"] = "Insufficient balance"
+                return result
             result.update({
                 "success": True,
                 "message": "Purchase applied",
-                "balance": int(row[0]),
-                "energy": int(row[1]),
-                "hunger": int(row[2]),
-                "water": int(row[3]),
+                "balance": row[0],
+                "energy": row[1],
+                "hunger": row[2],
+                "water": row[3],
             })
             return result
         except Exception as e:
-            try: conn.rollback()
-            except Exception: pass
             result["message"] = f"Purchase failed: {e}"
             return result
 
@@ -1095,18 +1402,12 @@ def seed_or_update_store_prices(db_path: Path, catalog: Dict[str, Dict[str, int]
     now = int(time.time())
     with connect(db_path) as conn:
         conn.execute("BEGIN IMMEDIATE")
-        _ensure_store_prices(conn)
+        # If exists, update base (but keep current); else insert with current=base
+        params = []
         for key, cfg in catalog.items():
             base = int(cfg.get("base_price_seconds", 60))
-            # If exists, update base (but keep current if present); else insert with current=base
-            row = conn.execute("SELECT item FROM time_store_prices WHERE item = ?", (key,)).fetchone()
-            if row:
-                conn.execute("UPDATE time_store_prices SET base_price_seconds = ?, updated_at = ? WHERE item = ?", (base, now, key))
-            else:
-                conn.execute(
-                    "INSERT INTO time_store_prices(item, base_price_seconds, current_price_seconds, updated_at) VALUES (?, ?, ?, ?)",
-                    (key, base, base, now)
-                )
+            params.append((key, base, base, now))
+        conn.executemany(_SQL_UPSERT_STORE_PRICE, params)
         conn.commit()
 
 
@@ -1115,32 +1416,24 @@ def refresh_store_prices(db_path: Path, volatility: float = 0.2) -> None:
     vol = max(0.0, float(volatility))
     now = int(time.time())
     with connect(db_path) as conn:
-        conn.execute("BEGIN IMMEDIATE")
-        _ensure_store_prices(conn)
-        rows = conn.execute("SELECT item, base_price_seconds FROM time_store_prices").fetchall()
-        for r in rows:
-            base = int(r[1])
-            factor = 1.0 + random.uniform(-vol, vol)
-            new_price = max(1, int(round(base * factor)))
-            conn.execute(
-                "UPDATE time_store_prices SET current_price_seconds = ?, updated_at = ? WHERE item = ?",
-                (new_price, now, r[0])
-            )
-        conn.commit()
+        # Jitter is drawn per row by SQLite's random(), folded into [-1, 1]
+        conn.execute(
+            "UPDATE time_store_prices SET current_price_seconds = MAX(1, CAST(ROUND(base_price_seconds * "
+            "(1.0 + (ABS(random() % 200001) - 100000) / 100000.0 * ?)) AS INTEGER)), updated_at = ?",
+            (vol, now),
+        )
 
 
 def get_store_prices(db_path: Path) -> List[Dict[str, int]]:
-    with connect(db_path) as conn:
-        _ensure_store_prices(conn)
-        cur = conn.execute("SELECT item, base_price_seconds, current_price_seconds, updated_at FROM time_store_prices ORDER BY item ASC")
+    with connect(db_path, row_factory=False, readonly=True) as conn:
+        # The market index rides along so callers price rows with the value read alongside them
+        cur = conn.execute(
+            "SELECT p.item, p.base_price_seconds, p.current_price_seconds, p.updated_at, COALESCE(cfg.market_index_percent, 0)\n"
+            "FROM time_store_prices p LEFT JOIN time_store_config cfg ON cfg.id = 1 ORDER BY p.item ASC"
+        )
         return [
-            {
-                "item": str(r[0]),
-                "base_price_seconds": int(r[1]),
-                "current_price_seconds": int(r[2]),
-                "updated_at": int(r[3]),
-            }
-            for r in cur.fetchall()
+            {"item": item, "base_price_seconds": base, "current_price_seconds": curr, "updated_at": ts, "market_index_percent": idx}
+            for (item, base, curr, ts, idx) in cur
         ]
 
 
@@ -1149,22 +1442,19 @@ def set_market_index_percent(db_path: Path, percent: int) -> None:
     if p < -50: p = -50
     if p > 300: p = 300
     with connect(db_path) as conn:
-        _ensure_store_config(conn)
         conn.execute(
             "INSERT INTO time_store_config(id, market_index_percent) VALUES (1, ?)\n"
             "ON CONFLICT(id) DO UPDATE SET market_index_percent = excluded.market_index_percent",
             (p,),
         )
-        conn.commit()
 
 
 def get_market_index_percent(db_path: Path) -> int:
-    with connect(db_path) as conn:
+    with connect(db_path, row_factory=False, readonly=True) as conn:
         # Avoid writes on read path; if table/row missing, treat as 0
         try:
-            _ensure_store_config(conn)
             row = conn.execute("SELECT market_index_percent FROM time_store_config WHERE id = 1").fetchone()
-            return int(row[0]) if row else 0
+            return row[0] if row else 0
         except Exception:
             return 0
 
@@ -1204,18 +1494,15 @@ def _ensure_earner_config(conn: sqlite3.Connection) -> None:
         conn.execute("ALTER TABLE time_earner_config ADD COLUMN default_per_block_percent REAL")
     # ensure row exists (id only), then set defaults where NULL
     conn.execute("INSERT OR IGNORE INTO time_earner_config(id) VALUES (1)")
-    conn.execute("UPDATE time_earner_config SET base_percent = COALESCE(base_percent, 0.10) WHERE id = 1")
-    conn.execute("UPDATE time_earner_config SET per_block_percent = COALESCE(per_block_percent, 0.0125) WHERE id = 1")
-    conn.execute("UPDATE time_earner_config SET min_seconds = COALESCE(min_seconds, 600) WHERE id = 1")
-    conn.execute("UPDATE time_earner_config SET block_seconds = COALESCE(block_seconds, 600) WHERE id = 1")
-    conn.execute("UPDATE time_earner_config SET promo_enabled = COALESCE(promo_enabled, 1) WHERE id = 1")
-    conn.execute("UPDATE time_earner_config SET default_bonus_percent = COALESCE(default_bonus_percent, 0.10) WHERE id = 1")
-    conn.execute("UPDATE time_earner_config SET default_per_block_percent = COALESCE(default_per_block_percent, 0.00) WHERE id = 1")
+    conn.execute(
+        "UPDATE time_earner_config SET base_percent = COALESCE(base_percent, 0.10), per_block_percent = COALESCE(per_block_percent, 0.0125),\n"
+        "min_seconds = COALESCE(min_seconds, 600), block_seconds = COALESCE(block_seconds, 600), promo_enabled = COALESCE(promo_enabled, 1),\n"
+        "default_bonus_percent = COALESCE(default_bonus_percent, 0.10), default_per_block_percent = COALESCE(default_per_block_percent, 0.00) WHERE id = 1"
+    )
 
 
 def get_earner_promo_config(db_path: Path) -> Dict[str, float | int]:
-    with connect(db_path) as conn:
-        _ensure_earner_config(conn)
+    with connect(db_path, readonly=True) as conn:
         row = conn.execute(
             "SELECT base_percent, per_block_percent, min_seconds, block_seconds, promo_enabled, default_bonus_percent, default_per_block_percent FROM time_earner_config WHERE id = 1"
         ).fetchone()
@@ -1241,100 +1528,85 @@ def set_earner_promo_config(db_path: Path, base_percent: float, per_block_percen
     dbonus = float(default_bonus_percent)
     dper = float(default_per_block_percent)
     with connect(db_path) as conn:
-        _ensure_earner_config(conn)
         conn.execute(
             "INSERT INTO time_earner_config(id, base_percent, per_block_percent, min_seconds, block_seconds, promo_enabled, default_bonus_percent, default_per_block_percent) VALUES (1, ?, ?, ?, ?, ?, ?, ?)\n"
             "ON CONFLICT(id) DO UPDATE SET base_percent=excluded.base_percent, per_block_percent=excluded.per_block_percent, min_seconds=excluded.min_seconds, block_seconds=excluded.block_seconds, promo_enabled=excluded.promo_enabled, default_bonus_percent=excluded.default_bonus_percent, default_per_block_percent=excluded.default_per_block_percent",
             (b, p, mn, bs, en, dbonus, dper),
         )
-        conn.commit()
 
 
 def upsert_store_item(db_path: Path, item: str, kind: str, qty: int, restore_energy: int, restore_hunger: int, restore_water: int, base_price_seconds: int, name: Optional[str] = None) -> None:
     now = int(time.time())
     with connect(db_path) as conn:
         conn.execute("BEGIN IMMEDIATE")
-        _ensure_store_catalog(conn)
-        _ensure_store_prices(conn)
-        # Assign sequence-like id only on first insert
-        row = conn.execute("SELECT id FROM time_store_catalog WHERE item = ?", (item,)).fetchone()
-        next_id = None
-        if not row:
-            rid_row = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM time_store_catalog").fetchone()
-            next_id = int(rid_row[0]) if rid_row else 1
-            conn.execute(
-                "INSERT INTO time_store_catalog(item, id, name, kind, qty, restore_energy, restore_hunger, restore_water) VALUES(?,?,?,?,?,?,?,?)",
-                (item, next_id, name, kind, int(qty), int(restore_energy), int(restore_hunger), int(restore_water))
-            )
-        else:
-            conn.execute(
-                "UPDATE time_store_catalog SET name=COALESCE(?, name), kind=?, qty=?, restore_energy=?, restore_hunger=?, restore_water=? WHERE item = ?",
-                (name, kind, int(qty), int(restore_energy), int(restore_hunger), int(restore_water), item)
-            )
-        # seed or update price
-        row = conn.execute("SELECT item FROM time_store_prices WHERE item = ?", (item,)).fetchone()
+        # Assign sequence-like id only on first insert; MAX(id) is a single seek on
+        # idx_time_store_catalog_id and BEGIN IMMEDIATE keeps it race-free
+        conn.execute(
+            "INSERT INTO time_store_catalog(item, id, name, kind, qty, restore_energy, restore_hunger, restore_water)\n"
+            "SELECT ?, COALESCE(MAX(id), 0) + 1, ?, ?, ?, ?, ?, ? FROM time_store_catalog WHERE true\n"
+            "ON CONFLICT(item) DO UPDATE SET name=COALESCE(excluded.name, name), kind=excluded.kind, qty=excluded.qty,\n"
+            "restore_energy=excluded.restore_energy, restore_hunger=excluded.restore_hunger, restore_water=excluded.restore_water",
+            (item, name, kind, int(qty), int(restore_energy), int(restore_hunger), int(restore_water))
+        )
+        # seed or update price (current price is kept for existing items)
         base = int(base_price_seconds)
-        if row:
-            conn.execute("UPDATE time_store_prices SET base_price_seconds = ?, updated_at = ? WHERE item = ?", (base, now, item))
-        else:
-            conn.execute("INSERT INTO time_store_prices(item, base_price_seconds, current_price_seconds, updated_at) VALUES (?,?,?,?)", (item, base, base, now))
+        conn.execute(_SQL_UPSERT_STORE_PRICE, (item, base, base, now))
         conn.commit()
 
 
 def set_store_item_qty(db_path: Path, item: str, qty: int) -> bool:
     with connect(db_path) as conn:
-        _ensure_store_catalog(conn)
         cur = conn.execute("UPDATE time_store_catalog SET qty = ? WHERE item = ?", (int(qty), item))
-        conn.commit()
         return (cur.rowcount or 0) > 0
 
 
 def list_store_items(db_path: Path) -> List[Dict[str, Any]]:
-    with connect(db_path) as conn:
-        _ensure_store_catalog(conn)
-        _ensure_store_prices(conn)
-        _ensure_store_config(conn)
-        p = get_market_index_percent(db_path)
+    with connect(db_path, row_factory=False, readonly=True) as conn:
         rows = conn.execute(
-            "SELECT c.item, c.name, c.kind, c.qty, c.restore_energy, c.restore_hunger, c.restore_water, p.base_price_seconds, p.current_price_seconds, c.id\n"
-            "FROM time_store_catalog c JOIN time_store_prices p ON c.item = p.item ORDER BY c.item ASC"
+            "SELECT c.item, c.name, c.kind, c.qty, c.restore_energy, c.restore_hunger, c.restore_water, p.base_price_seconds, p.current_price_seconds, c.id, cfg.market_index_percent\n"
+            "FROM time_store_catalog c JOIN time_store_prices p ON c.item = p.item LEFT JOIN time_store_config cfg ON cfg.id = 1 ORDER BY c.item ASC"
         ).fetchall()
-        out: List[Dict[str, Any]] = []
-        for r in rows:
-            base = int(r[7]); curr = int(r[8]); idx = float(p)/100.0
-            effective = max(1, int(round(curr * (1.0 + idx))))
-            out.append({
-                "item": str(r[0]),
-                "name": (str(r[1]) if r[1] is not None else None),
-                "kind": str(r[2]),
-                "qty": int(r[3]),
-                "restore_energy": int(r[4]),
-                "restore_hunger": int(r[5]),
-                "restore_water": int(r[6]),
-                "base_price_seconds": base,
-                "current_price_seconds": curr,
-                "effective_price_seconds": effective,
-                "market_index_percent": int(p),
-                "id": int(r[9]) if r[9] is not None else None,
-            })
-        return out
+    if not rows:
+        return []
+    # The market index is the same for every row; rounding matches purchase_store_item (half-to-even)
+    p = int(rows[0][10] or 0)
+    mul = 1.0 + float(p) / 100.0
+    return [
+        {
+            "item": item,
+            "name": name,
+            "kind": kind,
+            "qty": qty,
+            "restore_energy": re,
+            "restore_hunger": rh,
+            "restore_water": rw,
+            "base_price_seconds": base,
+            "current_price_seconds": curr,
+            "effective_price_seconds": max(1, int(round(curr * mul))),
+            "market_index_percent": p,
+            "id": cid,
+        }
+        for (item, name, kind, qty, re, rh, rw, base, curr, cid, _) in rows
+    ]
 
 
 def get_next_store_item_id(db_path: Path) -> int:
-    with connect(db_path) as conn:
-        _ensure_store_catalog(conn)
+    with connect(db_path, readonly=True) as conn:
         row = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM time_store_catalog").fetchone()
         return int(row[0]) if row and row[0] is not None else 1
 
 
 def store_item_exists(db_path: Path, item: str) -> bool:
-    with connect(db_path) as conn:
-        _ensure_store_catalog(conn)
+    with connect(db_path, readonly=True) as conn:
         row = conn.execute("SELECT 1 FROM time_store_catalog WHERE item = ?", (item,)).fetchone()
         return row is not None
 
 
 def _ensure_user_inventory(conn: sqlite3.Connection) -> None:
+    # Every access is by (user_id, item) or a user_id prefix, so the table is clustered
+    # on that key: lookups land on the row itself rather than on an index entry that
+    # then points back into a rowid table. Databases created before this keep the
+    # rowid layout, where the same key is served by the primary-key autoindex.
     conn.execute(
         """
         CREATE TABLE IF NOT EXISTS user_inventory (
@@ -1342,126 +1614,96 @@ def _ensure_user_inventory(conn: sqlite3.Connection) -> None:
             item TEXT NOT NULL,
             qty INTEGER NOT NULL DEFAULT 0,
             PRIMARY KEY (user_id, item)
-        )
+        ) WITHOUT ROWID
+        """
+    )
+    # Rows emptied by a decrement are dropped inline, so callers never issue their own
+    # cleanup DELETE. Keyed on (user_id, item) since the table may have no rowid.
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_user_inventory_zero
+        AFTER UPDATE OF qty ON user_inventory WHEN NEW.qty <= 0
+        BEGIN
+            DELETE FROM user_inventory WHERE user_id = NEW.user_id AND item = NEW.item;
+        END
         """
     )
 
 
-def purchase_store_item(db_path: Path, username: str, item: str, quantity: int, apply_now: bool = True) -> Dict[str, Any]:
+def purchase_store_item(db_path: Path, username: str, item: Optional[str], quantity: int, apply_now: bool = True, item_id: Optional[int] = None) -> Dict[str, Any]:
     """Atomically purchase quantity of item for username.
     If apply_now is True, immediately apply stat restore; otherwise store into user inventory.
+    If item_id is given, the item is resolved from the catalog id within the same transaction.
     Returns: {success, message, balance, energy, hunger, water, qty_remaining, stored}
     """
     q = int(max(1, quantity))
     result: Dict[str, Any] = {"success": False, "message": ""}
-    with connect(db_path) as conn:
+    with connect(db_path, row_factory=False) as conn:
         try:
             conn.execute("BEGIN IMMEDIATE")
-            _ensure_stats(conn)
-            _ensure_store_catalog(conn)
-            _ensure_store_prices(conn)
-            _ensure_store_config(conn)
-            _ensure_user_inventory(conn)
-            _ensure_premium(conn)
-            # Load user
-            u = conn.execute("SELECT id, active, balance_seconds, energy, hunger, water, premium_until FROM users WHERE username = ?", (username,)).fetchone()
+            if item_id is not None:
+                row = conn.execute("SELECT item FROM time_store_catalog WHERE id = ?", (int(item_id),)).fetchone()
+                if not row:
+                    result["message"] = "Item not found"; conn.rollback(); return result
+                item = str(row[0])
+            now_ts = int(time.time())
+            # User, item, price, market index, premium tier and zone multiplier in one read
+            u = conn.execute(_SQL_PURCHASE_CONTEXT, (now_ts, item, username)).fetchone()
             if not u:
                 result["message"] = "User not found"; conn.rollback(); return result
-            if not int(u["active"]):
+            if not u[1]:
                 result["message"] = "Account is deactivated"; conn.rollback(); return result
-            # Load item
-            r = conn.execute(
-                "SELECT c.qty, c.restore_energy, c.restore_hunger, c.restore_water, p.current_price_seconds FROM time_store_catalog c JOIN time_store_prices p ON c.item = p.item WHERE c.item = ?",
-                (item,)
-            ).fetchone()
-            if not r:
+            if u[6] is None or u[10] is None:
                 result["message"] = "Item not found"; conn.rollback(); return result
-            qty_avail = int(r[0])
+            qty_avail = u[6]
             if qty_avail < q:
                 result["message"] = "Insufficient stock"; conn.rollback(); return result
-            curr_price = int(r[4])
-            idx_percent = int(conn.execute("SELECT market_index_percent FROM time_store_config WHERE id = 1").fetchone()[0])
+            # Price math stays in Python: round() here is half-to-even, SQL ROUND() is not
+            curr_price = u[10]
+            idx_percent = int(u[11] or 0)
             effective = max(1, int(round(curr_price * (1.0 + float(idx_percent)/100.0))))
             # Premium discount by tier if active (or lifetime)
-            import time as _t
-            now_ts = int(_t.time())
-            is_lifetime = int(u.get("premium_is_lifetime", 0) if isinstance(u, sqlite3.Row) else 0) == 1
-            if is_lifetime or int(u["premium_until"] or 0) > now_ts:
-                # fetch tier
-                try:
-                    _ensure_premium_tiers(conn)
-                    row = conn.execute("SELECT premium_lifetime_seconds FROM users WHERE id = ?", (int(u["id"]),)).fetchone()
-                    lt = int(row[0]) if row and row[0] is not None else 0
-                    trow = _get_premium_tier_row(conn, lt)
-                    disc = float(trow[3]) if trow else 0.10
-                except Exception:
-                    disc = 0.10
+            premium_active = bool(u[3])
+            if premium_active:
+                disc = float(u[4]) if u[4] is not None else 0.10
                 effective = max(1, int(round(effective * (1.0 - disc))))
             # Timezone store multiplier (cons at richer zones): apply after premium discount
-            try:
-                tz = get_user_timezone_info.__globals__  # type: ignore
-            except Exception:
-                tz = None
-            try:
-                # Call helper to get multipliers
-                from . import db as _db_mod  # type: ignore
-            except Exception:
-                _db_mod = None  # type: ignore
-            try:
-                # reuse helpers in this module directly
-                tzm = get_timezone_multipliers(Path(str(db_path)) if isinstance(db_path, Path) else db_path, username)  # type: ignore
-                store_mul = float(tzm.get("store_multiplier", 1.0))
-            except Exception:
-                store_mul = 1.0
+            store_mul = float(u[12]) if u[12] is not None else 1.0
             effective = max(1, int(round(effective * store_mul)))
             total_cost = effective * q
-            bal = int(u["balance_seconds"])
-            if bal < total_cost:
-                result["message"] = "Insufficient balance"; conn.rollback(); return result
-            # Deduct balance
-            conn.execute("UPDATE users SET balance_seconds = balance_seconds - ? WHERE id = ?", (total_cost, int(u["id"])) )
+            uid = u[0]
             stored = False
             if apply_now:
-                # Apply stats
-                upper = 100
-                try:
-                    is_lifetime2 = int(u.get("premium_is_lifetime", 0) if isinstance(u, sqlite3.Row) else 0) == 1
-                    if is_lifetime2 or int(u["premium_until"] or 0) > now_ts:
-                        row2 = conn.execute("SELECT premium_lifetime_seconds FROM users WHERE id = ?", (int(u["id"]),)).fetchone()
-                        lt2 = int(row2[0]) if row2 and row2[0] is not None else 0
-                        trow2 = _get_premium_tier_row(conn, lt2)
-                        upper = int(trow2[4]) if trow2 else 250
-                except Exception:
-                    upper = 250 if int(u["premium_until"] or 0) > now_ts else 100
-                def cap(v: int) -> int: return 0 if v < 0 else (upper if v > upper else v)
-                new_energy = cap(int(u["energy"]) + int(r[1]) * q)
-                new_hunger = cap(int(u["hunger"]) + int(r[2]) * q)
-                new_water  = cap(int(u["water"])  + int(r[3]) * q)
-                conn.execute("UPDATE users SET energy = ?, hunger = ?, water = ? WHERE id = ?", (new_energy, new_hunger, new_water, int(u["id"])) )
+                # Deduct balance and apply capped stats in one statement
+                upper = (u[5] if u[5] is not None else 250) if premium_active else 100
+                post = conn.execute(
+                    _SQL_PURCHASE_CHARGE_APPLY,
+                    (total_cost, upper, u[7] * q, upper, u[8] * q, upper, u[9] * q, uid, total_cost),
+                ).fetchone()
             else:
+                post = conn.execute(_SQL_PURCHASE_CHARGE, (total_cost, uid, total_cost)).fetchone()
+            # The guarded UPDATE is the balance check: no row means it could not be charged
+            if not post:
+                result["message"] = "Insufficient balance"; conn.rollback(); return result
+            if not apply_now:
                 # Store into inventory
                 stored = True
-                conn.execute(
-                    "INSERT INTO user_inventory(user_id, item, qty) VALUES(?,?,?)\n"
-                    "ON CONFLICT(user_id, item) DO UPDATE SET qty = qty + excluded.qty",
-                    (int(u["id"]), item, q)
-                )
-            # Decrement stock
-            conn.execute("UPDATE time_store_catalog SET qty = qty - ? WHERE item = ?", (q, item))
-            # Read post state
-            post = conn.execute("SELECT balance_seconds, energy, hunger, water FROM users WHERE id = ?", (int(u["id"]),)).fetchone()
-            rem = conn.execute("SELECT qty FROM time_store_catalog WHERE item = ?", (item,)).fetchone()
+                conn.execute(_SQL_ADD_INVENTORY, (uid, item, q))
+            # Decrement stock, guarded the same way
+            rem = conn.execute(_SQL_TAKE_STOCK, (q, item, q)).fetchone()
+            if not rem:
+                result["message"] = "Insufficient stock"; conn.rollback(); return result
             conn.commit()
             return {
                 "success": True,
                 "message": "Purchase completed",
-                "balance": int(post[0]),
-                "energy": int(post[1]),
-                "hunger": int(post[2]),
-                "water": int(post[3]),
-                "qty_remaining": int(rem[0]) if rem else 0,
-                "unit_price_seconds": int(effective),
-                "total_cost_seconds": int(total_cost),
+                "balance": post[0],
+                "energy": post[1],
+                "hunger": post[2],
+                "water": post[3],
+                "qty_remaining": rem[0],
+                "unit_price_seconds": effective,
+                "total_cost_seconds": total_cost,
                 "stored": stored,
             }
         except Exception as e:
@@ -1472,95 +1714,90 @@ def purchase_store_item(db_path: Path, username: str, item: str, quantity: int,
 
 # Premium helpers
 def is_premium(db_path: Path, username: str) -> Dict[str, Any]:
-    with connect(db_path) as conn:
-        _ensure_premium(conn)
-        _ensure_premium_tiers(conn)
+    with connect(db_path, row_factory=False, readonly=True) as conn:
         row = conn.execute("SELECT premium_until, premium_is_lifetime, premium_lifetime_seconds FROM users WHERE username = ?", (username,)).fetchone()
-        if not row:
-            return {"active": False, "until": 0, "is_lifetime": False, "tier": None}
-        import time as _t
-        until = int(row[0] or 0)
-        is_life = int(row[1] or 0) == 1
-        lifetime = int(row[2] or 0)
-        trow = _get_premium_tier_row(conn, lifetime)
-        tier = int(trow[0]) if trow else 0
-        return {"active": (is_life or until > int(_t.time())), "until": until, "is_lifetime": is_life, "tier": tier}
+    if not row:
+        return {"active": False, "until": 0, "is_lifetime": False, "tier": None}
+    until = int(row[0] or 0)
+    is_life = int(row[1] or 0) == 1
+    lifetime = int(row[2] or 0)
+    trow = _premium_tier_for(db_path, lifetime)
+    tier = int(trow[0]) if trow else 0
+    return {"active": (is_life or until > int(time.time())), "until": until, "is_lifetime": is_life, "tier": tier}
 
 def get_user_premium_tier(db_path: Path, username: str) -> Dict[str, Any]:
-    with connect(db_path) as conn:
-        _ensure_premium(conn)
-        _ensure_premium_tiers(conn)
+    with connect(db_path, row_factory=False, readonly=True) as conn:
         row = conn.execute("SELECT premium_lifetime_seconds FROM users WHERE username = ?", (username,)).fetchone()
-        if not row:
-            return {"tier": 0, "min_seconds": 0, "earn_bonus_percent": 0.0, "store_discount_percent": 0.0, "stat_cap_percent": 100}
-        lt = int(row[0] or 0)
-        trow = _get_premium_tier_row(conn, lt)
-        if not trow:
-            return {"tier": 0, "min_seconds": 0, "earn_bonus_percent": 0.0, "store_discount_percent": 0.0, "stat_cap_percent": 100}
-        return {
-            "tier": int(trow[0]),
-            "min_seconds": int(trow[1]),
-            "earn_bonus_percent": float(trow[2]),
-            "store_discount_percent": float(trow[3]),
-            "stat_cap_percent": int(trow[4]),
-        }
+    if not row:
+        return {"tier": 0, "min_seconds": 0, "earn_bonus_percent": 0.0, "store_discount_percent": 0.0, "stat_cap_percent": 100}
+    lt = int(row[0] or 0)
+    trow = _premium_tier_for(db_path, lt)
+    if not trow:
+        return {"tier": 0, "min_seconds": 0, "earn_bonus_percent": 0.0, "store_discount_percent": 0.0, "stat_cap_percent": 100}
+    return {
+        "tier": int(trow[0]),
+        "min_seconds": int(trow[1]),
+        "earn_bonus_percent": float(trow[2]),
+        "store_discount_percent": float(trow[3]),
+        "stat_cap_percent": int(trow[4]),
+    }
 
 # ---- Admin helpers: premium tiers management ----
 def list_premium_tiers(db_path: Path) -> list[dict]:
-    with connect(db_path) as conn:
-        _ensure_premium_tiers(conn)
-        rows = conn.execute(
+    with connect(db_path, row_factory=False, readonly=True) as conn:
+        cur = conn.execute(
             "SELECT tier, min_seconds, earn_bonus_percent, store_discount_percent, stat_cap_percent FROM premium_tiers ORDER BY tier ASC"
-        ).fetchall()
+        )
         return [
             {
-                "tier": int(r[0]),
-                "min_seconds": int(r[1]),
-                "earn_bonus_percent": float(r[2]),
-                "store_discount_percent": float(r[3]),
-                "stat_cap_percent": int(r[4]),
+                "tier": int(tier),
+                "min_seconds": int(mins),
+                "earn_bonus_percent": float(bonus),
+                "store_discount_percent": float(disc),
+                "stat_cap_percent": int(cap),
             }
-            for r in rows
+            for (tier, mins, bonus, disc, cap) in cur
         ]
 
 def set_premium_tiers_defaults(db_path: Path) -> None:
     with connect(db_path) as conn:
-        _ensure_premium_tiers(conn)
+        conn.execute("BEGIN IMMEDIATE")
         seed_premium_tiers_defaults(conn)
         conn.commit()
+    _invalidate_premium_tiers(db_path)
 
 def add_or_replace_premium_tier(db_path: Path, tier: int, min_seconds: int, earn_bonus_percent: float, store_discount_percent: float, stat_cap_percent: int) -> None:
     with connect(db_path) as conn:
-        _ensure_premium_tiers(conn)
+        conn.execute("BEGIN IMMEDIATE")
         conn.execute(
             "INSERT INTO premium_tiers(tier, min_seconds, earn_bonus_percent, store_discount_percent, stat_cap_percent) VALUES (?,?,?,?,?)\n"
             "ON CONFLICT(tier) DO UPDATE SET min_seconds=excluded.min_seconds, earn_bonus_percent=excluded.earn_bonus_percent, store_discount_percent=excluded.store_discount_percent, stat_cap_percent=excluded.stat_cap_percent",
             (int(tier), int(min_seconds), float(earn_bonus_percent), float(store_discount_percent), int(stat_cap_percent)),
         )
         conn.commit()
+    _invalidate_premium_tiers(db_path)
 
 def remove_premium_tier(db_path: Path, tier: int) -> bool:
     with connect(db_path) as conn:
-        _ensure_premium_tiers(conn)
+        conn.execute("BEGIN IMMEDIATE")
         cur = conn.execute("DELETE FROM premium_tiers WHERE tier = ?", (int(tier),))
         conn.commit()
-        return (cur.rowcount or 0) > 0
+    _invalidate_premium_tiers(db_path)
+    return (cur.rowcount or 0) > 0
 
 # ---- Admin helpers: user premium progression controls ----
 def set_user_premium_tier(db_path: Path, username: str, tier: int) -> Dict[str, Any]:
     with connect(db_path) as conn:
         try:
             conn.execute("BEGIN IMMEDIATE")
-            _ensure_premium(conn)
-            _ensure_premium_tiers(conn)
-            u = conn.execute("SELECT id FROM users WHERE username = ?", (username,)).fetchone()
+            u = conn.execute(_SQL_USER_ID, (username,)).fetchone()
             if not u:
                 conn.rollback(); return {"success": False, "message": "User not found"}
             row = conn.execute("SELECT min_seconds FROM premium_tiers WHERE tier = ?", (int(tier),)).fetchone()
             if not row:
                 conn.rollback(); return {"success": False, "message": "Tier not found"}
             min_secs = int(row[0])
-            conn.execute("UPDATE users SET premium_lifetime_seconds = ?, premium_is_lifetime = CASE WHEN ? >= (SELECT min_seconds FROM premium_tiers WHERE tier = 10) THEN 1 ELSE premium_is_lifetime END WHERE id = ?", (min_secs, min_secs, int(u[0])))
+            conn.execute("UPDATE users SET premium_lifetime_seconds = ?, premium_is_lifetime = CASE WHEN ? >= (SELECT min_seconds FROM premium_tiers WHERE tier = 10) THEN 1 ELSE premium_is_lifetime END WHERE id = ?", (min_secs, min_secs, u["id"]))
             conn.commit()
             return {"success": True, "message": "User tier set", "tier": int(tier), "lifetime_seconds": int(min_secs)}
         except Exception as e:
@@ -1572,11 +1809,10 @@ def reset_user_premium_progress(db_path: Path, username: str) -> Dict[str, Any]:
     with connect(db_path) as conn:
         try:
             conn.execute("BEGIN IMMEDIATE")
-            _ensure_premium(conn)
-            u = conn.execute("SELECT id FROM users WHERE username = ?", (username,)).fetchone()
+            u = conn.execute(_SQL_USER_ID, (username,)).fetchone()
             if not u:
                 conn.rollback(); return {"success": False, "message": "User not found"}
-            conn.execute("UPDATE users SET premium_lifetime_seconds = 0, premium_is_lifetime = 0 WHERE id = ?", (int(u[0]),))
+            conn.execute("UPDATE users SET premium_lifetime_seconds = 0, premium_is_lifetime = 0 WHERE id = ?", (u["id"],))
             conn.commit()
             return {"success": True, "message": "User premium progression reset"}
         except Exception as e:
@@ -1585,41 +1821,25 @@ def reset_user_premium_progress(db_path: Path, username: str) -> Dict[str, Any]:
             return {"success": False, "message": f"Reset failed: {e}"}
 
 def set_user_premium_lifetime_seconds(db_path: Path, username: str, seconds: int) -> Dict[str, Any]:
-    with connect(db_path) as conn:
+    secs = int(max(0, seconds))
+    with connect(db_path, row_factory=False) as conn:
         try:
-            conn.execute("BEGIN IMMEDIATE")
-            _ensure_premium(conn)
-            _ensure_premium_tiers(conn)
-            u = conn.execute("SELECT id FROM users WHERE username = ?", (username,)).fetchone()
-            if not u:
-                conn.rollback(); return {"success": False, "message": "User not found"}
-            secs = int(max(0, seconds))
-            conn.execute("UPDATE users SET premium_lifetime_seconds = ? WHERE id = ?", (secs, int(u[0])))
-            # adjust lifetime flag according to tier 10 threshold
-            try:
-                thr = conn.execute("SELECT min_seconds FROM premium_tiers WHERE tier = 10").fetchone()
-                if thr and secs >= int(thr[0]):
-                    conn.execute("UPDATE users SET premium_is_lifetime = 1 WHERE id = ?", (int(u[0]),))
-                else:
-                    conn.execute("UPDATE users SET premium_is_lifetime = 0 WHERE id = ?", (int(u[0]),))
-            except Exception:
-                pass
-            conn.commit()
+            # Seconds and lifetime flag (against tier 10's threshold) in one statement (autocommit)
+            cur = conn.execute(_SQL_SET_PREMIUM_LIFETIME, (secs, secs, username))
+            if not cur.rowcount:
+                return {"success": False, "message": "User not found"}
             return {"success": True, "message": "Lifetime seconds set", "lifetime_seconds": secs}
         except Exception as e:
-            try: conn.rollback()
-            except Exception: pass
             return {"success": False, "message": f"Set lifetime seconds failed: {e}"}
 
 def set_user_premium_lifetime(db_path: Path, username: str, on: bool) -> Dict[str, Any]:
     with connect(db_path) as conn:
         try:
             conn.execute("BEGIN IMMEDIATE")
-            _ensure_premium(conn)
-            u = conn.execute("SELECT id FROM users WHERE username = ?", (username,)).fetchone()
+            u = conn.execute(_SQL_USER_ID, (username,)).fetchone()
             if not u:
                 conn.rollback(); return {"success": False, "message": "User not found"}
-            conn.execute("UPDATE users SET premium_is_lifetime = ? WHERE id = ?", (1 if on else 0, int(u[0])))
+            conn.execute("UPDATE users SET premium_is_lifetime = ? WHERE id = ?", (1 if on else 0, u["id"]))
             conn.commit()
             return {"success": True, "message": "Lifetime flag updated", "is_lifetime": bool(on)}
         except Exception as e:
@@ -1633,36 +1853,30 @@ def backfill_lifetime_from_remaining(db_path: Path, username: Optional[str] = No
     If username is None or empty, process all users with active premium.
     Returns: {success, message, updated}
     """
-    import time as _t
-    now = int(_t.time())
+    now = int(time.time())
     mode_norm = (mode or "add").strip().lower()
     if mode_norm not in ("add", "set"):
         mode_norm = "add"
+    # New lifetime total per user, and the lifetime unlock evaluated against that same
+    # total (SET expressions all see the pre-update row)
+    new_secs = "MAX(0, COALESCE(premium_until, 0) - ?)"
+    if mode_norm == "add":
+        new_secs = "COALESCE(premium_lifetime_seconds, 0) + " + new_secs
+    if username:
+        where, key = "username = ?", username
+    else:
+        where, key = "premium_until IS NOT NULL AND premium_until > ?", now
+    sql = (
+        f"UPDATE users SET premium_lifetime_seconds = {new_secs},\n"
+        f"  premium_is_lifetime = CASE WHEN t.min10 > 0 AND {new_secs} >= t.min10 THEN 1 ELSE premium_is_lifetime END\n"
+        "FROM (SELECT COALESCE((SELECT min_seconds FROM premium_tiers WHERE tier = 10), 0) AS min10) AS t\n"
+        f"WHERE {where}"
+    )
     with connect(db_path) as conn:
         try:
             conn.execute("BEGIN IMMEDIATE")
-            _ensure_premium(conn)
-            _ensure_premium_tiers(conn)
-            thr = conn.execute("SELECT min_seconds FROM premium_tiers WHERE tier = 10").fetchone()
-            tier10 = int(thr[0]) if thr else 0
-            updated = 0
-            if username:
-                rows = conn.execute("SELECT id, premium_until, premium_lifetime_seconds FROM users WHERE username = ?", (username,)).fetchall()
-            else:
-                rows = conn.execute("SELECT id, premium_until, premium_lifetime_seconds FROM users WHERE premium_until IS NOT NULL AND premium_until > ?", (now,)).fetchall()
-            for r in rows:
-                uid = int(r[0])
-                until = int(r[1] or 0)
-                remaining = max(0, until - now)
-                curr = int(r[2] or 0)
-                if mode_norm == "set":
-                    new_secs = remaining
-                else:
-                    new_secs = curr + remaining
-                conn.execute("UPDATE users SET premium_lifetime_seconds = ? WHERE id = ?", (int(new_secs), uid))
-                if tier10 > 0 and new_secs >= tier10:
-                    conn.execute("UPDATE users SET premium_is_lifetime = 1 WHERE id = ?", (uid,))
-                updated += 1
+            cur = conn.execute(sql, (now, now, key))
+            updated = cur.rowcount or 0
             conn.commit()
             return {"success": True, "message": "Backfill completed", "updated": int(updated)}
         except Exception as e:
@@ -1683,15 +1897,10 @@ def premium_daily_restore(db_path: Path, username: str) -> Dict[str, Any]:
     """Allow a premium user to restore stats (energy/hunger/water) to their tier max cap once every 24h.
     Returns: {success, message, energy, hunger, water, next_available_seconds}
     """
-    import time as _t
-    now = int(_t.time())
+    now = int(time.time())
     with connect(db_path) as conn:
         try:
             conn.execute("BEGIN IMMEDIATE")
-            _ensure_stats(conn)
-            _ensure_premium(conn)
-            _ensure_premium_tiers(conn)
-            _ensure_premium_daily(conn)
             u = conn.execute(
                 "SELECT id, active, energy, hunger, water, premium_until, premium_is_lifetime, premium_last_daily_restore "
                 "FROM users WHERE username = ?",
@@ -1699,12 +1908,12 @@ def premium_daily_restore(db_path: Path, username: str) -> Dict[str, Any]:
             ).fetchone()
             if not u:
                 conn.rollback(); return {"success": False, "message": "User not found"}
-            if not int(u[1]):
+            if not u["active"]:
                 conn.rollback(); return {"success": False, "message": "Account is deactivated"}
-            prem_active = (int(u[6] or 0) == 1) or (int(u[5] or 0) > now)
+            prem_active = u["premium_is_lifetime"] == 1 or (u["premium_until"] or 0) > now
             if not prem_active:
                 conn.rollback(); return {"success": False, "message": "Premium required"}
-            last = int(u[7] or 0)
+            last = u["premium_last_daily_restore"] or 0
             if last and (now - last) < 86400:
                 remaining = 86400 - (now - last)
                 conn.rollback(); return {"success": False, "message": "Restore available later", "next_available_seconds": int(remaining)}
@@ -1715,15 +1924,15 @@ def premium_daily_restore(db_path: Path, username: str) -> Dict[str, Any]:
                 "    SELECT premium_lifetime_seconds FROM users WHERE id = ?\n"
                 "  )\n"
                 ")",
-                (int(u[0]),)
+                (u["id"],)
             ).fetchone()
             cap = int(prow[0]) if prow and int(prow[0]) > 0 else 100
             # Set all three stats to cap (do not exceed cap)
-            conn.execute(
-                "UPDATE users SET energy = ?, hunger = ?, water = ?, premium_last_daily_restore = ? WHERE id = ?",
-                (cap, cap, cap, now, int(u[0]))
-            )
-            post = conn.execute("SELECT energy, hunger, water FROM users WHERE id = ?", (int(u[0]),)).fetchone()
+            post = conn.execute(
+                "UPDATE users SET energy = ?, hunger = ?, water = ?, premium_last_daily_restore = ? WHERE id = ?\n"
+                "RETURNING energy, hunger, water",
+                (cap, cap, cap, now, u["id"])
+            ).fetchone()
             conn.commit()
             return {"success": True, "message": "Restored to cap", "energy": int(post[0]), "hunger": int(post[1]), "water": int(post[2]), "next_available_seconds": 86400}
         except Exception as e:
@@ -1739,36 +1948,19 @@ def add_premium_lifetime_progress(db_path: Path, username: str, seconds: int) ->
     incr = int(max(0, seconds))
     if incr == 0:
         return {"success": True, "message": "No change", "lifetime_seconds": None}
-    import time as _t
-    with connect(db_path) as conn:
+    with connect(db_path, row_factory=False) as conn:
         try:
-            conn.execute("BEGIN IMMEDIATE")
-            _ensure_premium(conn)
-            _ensure_premium_tiers(conn)
-            u = conn.execute("SELECT id, premium_lifetime_seconds, premium_is_lifetime FROM users WHERE username = ?", (username,)).fetchone()
-            if not u:
-                conn.rollback(); return {"success": False, "message": "User not found"}
-            uid = int(u[0]); cur = int(u[1] or 0)
-            new_secs = cur + incr
-            conn.execute("UPDATE users SET premium_lifetime_seconds = ? WHERE id = ?", (new_secs, uid))
-            # Determine new tier and lifetime flag
-            tier_rows = conn.execute("SELECT tier, min_seconds FROM premium_tiers ORDER BY tier ASC").fetchall()
-            current_tier = 0
-            tier10 = 0
-            for tr in tier_rows:
-                t = int(tr[0]); ms = int(tr[1])
-                if t == 10: tier10 = ms
-                if ms <= new_secs and t > current_tier:
-                    current_tier = t
-            if tier10 > 0 and new_secs >= tier10:
-                conn.execute("UPDATE users SET premium_is_lifetime = 1 WHERE id = ?", (uid,))
-            conn.commit()
-            is_life = int(conn.execute("SELECT premium_is_lifetime FROM users WHERE id = ?", (uid,)).fetchone()[0]) == 1
-            return {"success": True, "message": "Progress added", "lifetime_seconds": int(new_secs), "current_tier": int(current_tier), "is_lifetime": bool(is_life)}
+            # Add and unlock lifetime (sticky) in one statement (autocommit); no row means no such user
+            row = conn.execute(_SQL_ADD_PREMIUM_LIFETIME, (incr, incr, username)).fetchone()
+            if not row:
+                return {"success": False, "message": "User not found"}
+            new_secs, is_life = row
         except Exception as e:
-            try: conn.rollback()
-            except Exception: pass
             return {"success": False, "message": f"Add progression failed: {e}"}
+    # The reported tier is informational only, so the tiers cache serves it
+    trow = _premium_tier_for(db_path, new_secs)
+    current_tier = trow[0] if trow else 0
+    return {"success": True, "message": "Progress added", "lifetime_seconds": new_secs, "current_tier": current_tier, "is_lifetime": bool(is_life)}
 
 
 def purchase_premium(db_path: Path, username: str, seconds: int) -> Dict[str, Any]:
@@ -1779,135 +1971,77 @@ def purchase_premium(db_path: Path, username: str, seconds: int) -> Dict[str, An
     result: Dict[str, Any] = {"success": False, "message": ""}
     if secs <= 0:
         result["message"] = "Duration must be > 0"; return result
-    with connect(db_path) as conn:
+    cost = secs * 3
+    with connect(db_path, row_factory=False) as conn:
         try:
-            conn.execute("BEGIN IMMEDIATE")
-            _ensure_premium(conn)
-            u = conn.execute("SELECT id, active, balance_seconds, premium_until FROM users WHERE username = ?", (username,)).fetchone()
-            if not u:
-                result["message"] = "User not found"; conn.rollback(); return result
-            if not int(u[1]):
-                result["message"] = "Account is deactivated"; conn.rollback(); return result
-            import time as _t
-            now = int(_t.time())
-            active = int(u[3] or 0) > now
-            if not active and secs < 10800:
-                result["message"] = "Minimum 3h for first purchase"; conn.rollback(); return result
-            cost = secs * 3
-            bal = int(u[2])
-            if bal < cost:
-                result["message"] = "Insufficient balance"; conn.rollback(); return result
-            # Deduct and extend
-            conn.execute("UPDATE users SET balance_seconds = balance_seconds - ? WHERE id = ?", (cost, int(u[0])))
-            base = int(u[3] or 0)
-            start = base if base > now else now
-            new_until = start + secs
-            conn.execute("UPDATE users SET premium_until = ? WHERE id = ?", (new_until, int(u[0])))
-            # Increment lifetime accumulation for buyer
-            conn.execute(
-                "UPDATE users SET premium_lifetime_seconds = premium_lifetime_seconds + ? WHERE id = ?",
-                (secs, int(u[0]))
-            )
-            # Unlock lifetime if threshold reached
-            try:
-                thr = conn.execute("SELECT min_seconds FROM premium_tiers WHERE tier = 10").fetchone()
-                if thr:
-                    min10 = int(thr[0])
-                    cur_lt = conn.execute("SELECT premium_lifetime_seconds FROM users WHERE id = ?", (int(u[0]),)).fetchone()
-                    if cur_lt and int(cur_lt[0] or 0) >= min10:
-                        conn.execute("UPDATE users SET premium_is_lifetime = 1 WHERE id = ?", (int(u[0]),))
-            except Exception:
-                pass
-            nb = conn.execute("SELECT balance_seconds FROM users WHERE id = ?", (int(u[0]),)).fetchone()[0]
-            conn.commit()
-            return {"success": True, "message": "Premium purchased", "balance": int(nb), "premium_until": int(new_until), "cost": int(cost)}
+            now = int(time.time())
+            # Deduct, extend, accumulate lifetime and unlock lifetime in one statement (autocommit)
+            row = conn.execute(_SQL_PURCHASE_PREMIUM, (cost, now, secs, secs, secs, username, cost, now, secs)).fetchone()
+            if not row:
+                # A guard failed: re-read only to pick the message
+                u = conn.execute("SELECT active, premium_until FROM users WHERE username = ?", (username,)).fetchone()
+                if not u:
+                    result["message"] = "User not found"
+                elif not u[0]:
+                    result["message"] = "Account is deactivated"
+                elif not u[1] > now and secs < 10800:
+                    result["message"] = "Minimum 3h for first purchase"
+                else:
+                    result["message"] = "Insufficient balance"
+                return result
+            return {"success": True, "message": "Premium purchased", "balance": row[0], "premium_until": row[1], "cost": cost}
         except Exception as e:
-            try: conn.rollback()
-            except Exception: pass
             result["message"] = f"Premium purchase failed: {e}"
             return result
 
 
 def purchase_store_item_by_id(db_path: Path, username: str, item_id: int, quantity: int, apply_now: bool = True) -> Dict[str, Any]:
-    # resolve id to item key then reuse implementation
-    with connect(db_path) as conn:
-        row = conn.execute("SELECT item FROM time_store_catalog WHERE id = ?", (int(item_id),)).fetchone()
-        if not row:
-            return {"success": False, "message": "Item not found"}
-        key = str(row[0])
-    return purchase_store_item(db_path, username, key, quantity, apply_now=apply_now)
+    # the id is resolved inside purchase_store_item's write transaction
+    return purchase_store_item(db_path, username, None, quantity, apply_now=apply_now, item_id=item_id)
 
 
 def list_user_inventory(db_path: Path, username: str) -> List[Dict[str, Any]]:
-    with connect(db_path) as conn:
-        _ensure_user_inventory(conn)
-        _ensure_store_catalog(conn)
-        u = conn.execute("SELECT id FROM users WHERE username = ?", (username,)).fetchone()
-        if not u:
-            return []
-        rows = conn.execute(
+    # Columns come back already typed (INTEGER/TEXT affinity), so rows map straight to dicts
+    with connect(db_path, row_factory=False, readonly=True) as conn:
+        cur = conn.execute(
             "SELECT ui.item, ui.qty, c.name, c.kind, c.restore_energy, c.restore_hunger, c.restore_water, c.id\n"
-            "FROM user_inventory ui JOIN time_store_catalog c ON ui.item = c.item WHERE ui.user_id = ? ORDER BY c.item",
-            (int(u[0]),)
-        ).fetchall()
-        out: List[Dict[str, Any]] = []
-        for r in rows:
-            out.append({
-                "item": str(r[0]),
-                "qty": int(r[1]),
-                "name": (str(r[2]) if r[2] is not None else None),
-                "kind": str(r[3]),
-                "restore_energy": int(r[4]),
-                "restore_hunger": int(r[5]),
-                "restore_water": int(r[6]),
-                "id": int(r[7]) if r[7] is not None else None,
-            })
-        return out
+            "FROM users u JOIN user_inventory ui ON ui.user_id = u.id JOIN time_store_catalog c ON ui.item = c.item\n"
+            "WHERE u.username = ? ORDER BY ui.item",
+            (username,)
+        )
+        return [
+            {
+                "item": item,
+                "qty": qty,
+                "name": name,
+                "kind": kind,
+                "restore_energy": re,
+                "restore_hunger": rh,
+                "restore_water": rw,
+                "id": cid,
+            }
+            for (item, qty, name, kind, re, rh, rw, cid) in cur
+        ]
 
 
 def use_inventory_item(db_path: Path, username: str, item: str, quantity: int) -> Dict[str, Any]:
     q = int(max(1, quantity))
-    with connect(db_path) as conn:
+    with connect(db_path, row_factory=False) as conn:
         try:
             conn.execute("BEGIN IMMEDIATE")
-            _ensure_stats(conn)
-            _ensure_premium(conn)
-            _ensure_premium_tiers(conn)
-            _ensure_user_inventory(conn)
-            _ensure_store_catalog(conn)
-            # Load user
-            u = conn.execute("SELECT id, energy, hunger, water, premium_until, premium_is_lifetime, premium_lifetime_seconds FROM users WHERE username = ?", (username,)).fetchone()
-            if not u:
-                conn.rollback(); return {"success": False, "message": "User not found"}
-            # Check inventory
-            row = conn.execute("SELECT qty FROM user_inventory WHERE user_id = ? AND item = ?", (int(u[0]), item)).fetchone()
-            if not row or int(row[0]) < q:
-                conn.rollback(); return {"success": False, "message": "Not enough in inventory"}
-            # Get item effects
-            eff = conn.execute("SELECT restore_energy, restore_hunger, restore_water FROM time_store_catalog WHERE item = ?", (item,)).fetchone()
-            if not eff:
+            # Take from inventory first; no row means no such user or not enough held
+            inv = conn.execute(_SQL_TAKE_INVENTORY_BY_NAME, (q, username, item, q)).fetchone()
+            if not inv:
+                u = conn.execute(_SQL_USER_ID, (username,)).fetchone()
+                msg = "User not found" if not u else "Not enough in inventory"
+                conn.rollback(); return {"success": False, "message": msg}
+            uid = inv[0]
+            # Apply the item's effects, capped in SQL by the user's premium tier
+            post = conn.execute(_SQL_USE_ITEM_STATS, (q, q, q, int(time.time()), uid, item)).fetchone()
+            if not post:
                 conn.rollback(); return {"success": False, "message": "Item not found"}
-            import time as _t
-            now_ts = int(_t.time())
-            upper = 100
-            try:
-                is_life = int(u[5] or 0) == 1
-                if is_life or int(u[4] or 0) > now_ts:
-                    trow = _get_premium_tier_row(conn, int(u[6] or 0))
-                    upper = int(trow[4]) if trow else 250
-            except Exception:
-                upper = 250 if int(u[4] or 0) > now_ts else 100
-            def cap(v: int) -> int: return 0 if v < 0 else (upper if v > upper else v)
-            new_energy = cap(int(u[1]) + int(eff[0]) * q)
-            new_hunger = cap(int(u[2]) + int(eff[1]) * q)
-            new_water  = cap(int(u[3]) + int(eff[2]) * q)
-            conn.execute("UPDATE users SET energy = ?, hunger = ?, water = ? WHERE id = ?", (new_energy, new_hunger, new_water, int(u[0])))
-            conn.execute("UPDATE user_inventory SET qty = qty - ? WHERE user_id = ? AND item = ?", (q, int(u[0]), item))
-            # Clean zero rows
-            conn.execute("DELETE FROM user_inventory WHERE user_id = ? AND item = ? AND qty <= 0", (int(u[0]), item))
-            post = conn.execute("SELECT energy, hunger, water FROM users WHERE id = ?", (int(u[0]),)).fetchone()
             conn.commit()
-            return {"success": True, "message": "Used item", "energy": int(post[0]), "hunger": int(post[1]), "water": int(post[2])}
+            return {"success": True, "message": "Used item", "energy": post[0], "hunger": post[1], "water": post[2]}
         except Exception as e:
             try: conn.rollback()
             except Exception: pass
@@ -1917,43 +2051,36 @@ def use_inventory_item(db_path: Path, username: str, item: str, quantity: int) -
 def transfer_inventory_item(db_path: Path, from_username: str, to_username: str, item: str, quantity: int) -> Dict[str, Any]:
     """Transfer quantity of item from one user's inventory to another's, atomically."""
     q = int(max(1, quantity))
+    if from_username == to_username:
+        return {"success": False, "message": "Cannot transfer to the same account"}
     with connect(db_path) as conn:
         try:
             conn.execute("BEGIN IMMEDIATE")
-            _ensure_user_inventory(conn)
             # Load users
-            u_from = conn.execute("SELECT id, active FROM users WHERE username = ?", (from_username,)).fetchone()
-            u_to = conn.execute("SELECT id, active FROM users WHERE username = ?", (to_username,)).fetchone()
+            by_name = {r["username"]: r for r in conn.execute(_SQL_USER_PAIR, (from_username, to_username))}
+            u_from = by_name.get(from_username)
+            u_to = by_name.get(to_username)
             if not u_from:
                 conn.rollback(); return {"success": False, "message": "Sender not found"}
             if not u_to:
                 conn.rollback(); return {"success": False, "message": "Recipient not found"}
-            if not int(u_from[1]):
+            if not u_from["active"]:
                 conn.rollback(); return {"success": False, "message": "Sender account is deactivated"}
-            if not int(u_to[1]):
+            if not u_to["active"]:
                 conn.rollback(); return {"success": False, "message": "Recipient account is deactivated"}
             # Check sender inventory
-            row = conn.execute("SELECT qty FROM user_inventory WHERE user_id = ? AND item = ?", (int(u_from[0]), item)).fetchone()
-            if not row or int(row[0]) < q:
+            row = conn.execute(_SQL_INVENTORY_QTY, (u_from["id"], item)).fetchone()
+            if not row or row[0] < q:
                 conn.rollback(); return {"success": False, "message": "Not enough in inventory"}
-            # Move
-            conn.execute("UPDATE user_inventory SET qty = qty - ? WHERE user_id = ? AND item = ?", (q, int(u_from[0]), item))
-            conn.execute(
-                "INSERT INTO user_inventory(user_id, item, qty) VALUES(?,?,?)\n"
-                "ON CONFLICT(user_id, item) DO UPDATE SET qty = qty + excluded.qty",
-                (int(u_to[0]), item, q)
-            )
-            # Clean zero rows for sender
-            conn.execute("DELETE FROM user_inventory WHERE user_id = ? AND item = ? AND qty <= 0", (int(u_from[0]), item))
-            # Read post
-            post_from = conn.execute("SELECT qty FROM user_inventory WHERE user_id = ? AND item = ?", (int(u_from[0]), item)).fetchone()
-            post_to = conn.execute("SELECT qty FROM user_inventory WHERE user_id = ? AND item = ?", (int(u_to[0]), item)).fetchone()
+            # Move; both writes return the post-move quantities
+            left = conn.execute(_SQL_TAKE_INVENTORY, (q, u_from["id"], item)).fetchone()[0]
+            got = conn.execute(_SQL_ADD_INVENTORY_RETURNING, (u_to["id"], item, q)).fetchone()[0]
             conn.commit()
             return {
                 "success": True,
                 "message": "Transfer completed",
-                "sender_qty": int(post_from[0]) if post_from else 0,
-                "recipient_qty": int(post_to[0]) if post_to else q,
+                "sender_qty": left,
+                "recipient_qty": got,
             }
         except Exception as e:
             try: conn.rollback()
@@ -1966,56 +2093,39 @@ def sell_inventory_item(db_path: Path, username: str, item: str, quantity: int)
     Non-premium: 75% of effective price. Premium: 85% of effective price.
     """
     q = int(max(1, quantity))
-    with connect(db_path) as conn:
+    with connect(db_path, row_factory=False) as conn:
         try:
             conn.execute("BEGIN IMMEDIATE")
-            _ensure_user_inventory(conn)
-            _ensure_store_catalog(conn)
-            _ensure_store_prices(conn)
-            _ensure_premium(conn)
-            # Load user
-            u = conn.execute("SELECT id, active, balance_seconds, premium_until FROM users WHERE username = ?", (username,)).fetchone()
+            # User, held qty, price and market index in one read
+            u = conn.execute(_SQL_SELL_CONTEXT, (int(time.time()), item, item, username)).fetchone()
             if not u:
                 conn.rollback(); return {"success": False, "message": "User not found"}
-            if not int(u[1]):
+            uid, active, is_prem, held, curr_price, idx_percent = u
+            if not active:
                 conn.rollback(); return {"success": False, "message": "Account is deactivated"}
-            # Check inventory
-            row = conn.execute("SELECT qty FROM user_inventory WHERE user_id = ? AND item = ?", (int(u[0]), item)).fetchone()
-            if not row or int(row[0]) < q:
+            if held is None or held < q:
                 conn.rollback(); return {"success": False, "message": "Not enough in inventory"}
-            # Determine effective price
-            r = conn.execute(
-                "SELECT p.current_price_seconds FROM time_store_prices p WHERE p.item = ?",
-                (item,)
-            ).fetchone()
-            if not r:
+            if curr_price is None:
                 conn.rollback(); return {"success": False, "message": "Item price not found"}
-            curr_price = int(r[0])
-            idx_percent = int(conn.execute("SELECT market_index_percent FROM time_store_config WHERE id = 1").fetchone()[0])
-            effective = max(1, int(round(curr_price * (1.0 + float(idx_percent)/100.0))))
-            # Premium rate
-            import time as _t
-            is_prem = int(u[3] or 0) > int(_t.time())
-            rate = 0.85 if is_prem else 0.75
-            unit_payout = max(1, int(round(effective * rate)))
+            # Price math stays in Python so the payout rounds like the listed price does
+            effective = max(1, int(round(curr_price * (1.0 + float(idx_percent or 0)/100.0))))
+            rate_percent = SELL_RATE_PERCENT_PREMIUM if is_prem else SELL_RATE_PERCENT
+            unit_payout = max(1, int(round(effective * (rate_percent / 100.0))))
             total_payout = unit_payout * q
-            # Apply changes
-            conn.execute("UPDATE users SET balance_seconds = balance_seconds + ? WHERE id = ?", (int(total_payout), int(u[0])))
-            conn.execute("UPDATE user_inventory SET qty = qty - ? WHERE user_id = ? AND item = ?", (q, int(u[0]), item))
-            conn.execute("DELETE FROM user_inventory WHERE user_id = ? AND item = ? AND qty <= 0", (int(u[0]), item))
-            post_bal = conn.execute("SELECT balance_seconds FROM users WHERE id = ?", (int(u[0]),)).fetchone()
-            post_qty = conn.execute("SELECT qty FROM user_inventory WHERE user_id = ? AND item = ?", (int(u[0]), item)).fetchone()
+            # Apply changes; both writes return the post-sale values
+            post_bal = conn.execute(_SQL_CREDIT_USER, (total_payout, uid)).fetchone()
+            left = conn.execute(_SQL_TAKE_INVENTORY, (q, uid, item)).fetchone()[0]
             conn.commit()
             return {
                 "success": True,
                 "message": "Sold item(s)",
-                "balance": int(post_bal[0]) if post_bal else None,
-                "unit_effective_price_seconds": int(effective),
-                "unit_payout_seconds": int(unit_payout),
-                "total_payout_seconds": int(total_payout),
-                "remaining_qty": int(post_qty[0]) if post_qty else 0,
+                "balance": post_bal[0] if post_bal else None,
+                "unit_effective_price_seconds": effective,
+                "unit_payout_seconds": unit_payout,
+                "total_payout_seconds": total_payout,
+                "remaining_qty": left,
                 "premium": bool(is_prem),
-                "rate_percent": int(rate * 100),
+                "rate_percent": rate_percent,
             }
         except Exception as e:
             try: conn.rollback()
@@ -2039,8 +2149,9 @@ def transfer_seconds(db_path: Path, from_username: str, to_username: str, amount
     with connect(db_path) as conn:
         try:
             conn.execute("BEGIN IMMEDIATE")
-            f = conn.execute("SELECT id, balance_seconds, active FROM users WHERE username = ?", (from_username,)).fetchone()
-            t = conn.execute("SELECT id, balance_seconds, active FROM users WHERE username = ?", (to_username,)).fetchone()
+            by_name = {r["username"]: r for r in conn.execute(_SQL_USER_PAIR, (from_username, to_username))}
+            f = by_name.get(from_username)
+            t = by_name.get(to_username)
             if not f or not t:
                 result["message"] = "User not found"
                 conn.rollback()
@@ -2053,27 +2164,18 @@ def transfer_seconds(db_path: Path, from_username: str, to_username: str, amount
                 result["message"] = "Recipient account is deactivated"
                 conn.rollback()
                 return result
-            if int(f["balance_seconds"]) < amount:
+            if f["balance_seconds"] < amount:
                 result["message"] = "Insufficient balance"
                 conn.rollback()
                 return result
 
-            conn.execute(
-                "UPDATE users SET balance_seconds = balance_seconds - ? WHERE id = ?",
-                (amount, int(f["id"]))
-            )
-            conn.execute(
-                "UPDATE users SET balance_seconds = balance_seconds + ? WHERE id = ?",
-                (amount, int(t["id"]))
-            )
-            # read updated balances
-            f2 = conn.execute("SELECT balance_seconds FROM users WHERE id = ?", (int(f["id"]),)).fetchone()
-            t2 = conn.execute("SELECT balance_seconds FROM users WHERE id = ?", (int(t["id"]),)).fetchone()
+            # Debit and credit in one statement; updated balances come back keyed by id
+            post = dict(conn.execute(_SQL_MOVE_SECONDS, (f["id"], amount, t["id"], amount, f["id"], t["id"])).fetchall())
             conn.commit()
             result["success"] = True
             result["message"] = "Transfer completed"
-            result["from_balance"] = int(f2[0]) if f2 else None
-            result["to_balance"] = int(t2[0]) if t2 else None
+            result["from_balance"] = post.get(f["id"])
+            result["to_balance"] = post.get(t["id"])
             return result
         except Exception as e:
             try:
@@ -2088,15 +2190,14 @@ def get_statistics(db_path: Path) -> Dict[str, int]:
     """Return aggregate statistics for admin dashboards.
     Keys: total_users, total_active, total_deactivated, total_balance_seconds
     """
-    with connect(db_path) as conn:
-        total_users = int(conn.execute("SELECT COUNT(*) FROM users").fetchone()[0])
-        total_active = int(conn.execute("SELECT COUNT(*) FROM users WHERE active = 1").fetchone()[0])
-        total_deactivated = int(conn.execute("SELECT COUNT(*) FROM users WHERE active = 0").fetchone()[0])
-        row = conn.execute("SELECT COALESCE(SUM(balance_seconds), 0) FROM users").fetchone()
-        total_balance_seconds = int(row[0]) if row and row[0] is not None else 0
-        return {
-            "total_users": total_users,
-            "total_active": total_active,
-            "total_deactivated": total_deactivated,
-            "total_balance_seconds": total_balance_seconds,
-        }
+    with connect(db_path, row_factory=False, readonly=True) as conn:
+        # All four aggregates in one pass over users
+        row = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(active = 1), 0), COALESCE(SUM(active = 0), 0), COALESCE(SUM(balance_seconds), 0) FROM users"
+        ).fetchone()
+    return {
+        "total_users": int(row[0]),
+        "total_active": int(row[1]),
+        "total_deactivated": int(row[2]),
+        "total_balance_seconds": int(row[3]),
+    }
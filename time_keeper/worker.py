@@ -6,9 +6,11 @@ from . import db
 
 
 class Worker:
-    def __init__(self, db_path: Path, interval_seconds: float = 1.0):
+    def __init__(self, db_path: Path, interval_seconds: float = 1.0, batch_ticks: int = 1):
         self.db_path = db_path
         self.interval = float(interval_seconds)
+        # Ticks applied per commit; >1 trades balance granularity for fewer commits
+        self.batch = max(1, int(batch_ticks))
         self._running = True
 
     def _handle_stop(self, *_):
@@ -22,14 +24,32 @@ class Worker:
             pass
         print("Time Keeper worker started. Press Ctrl+C to stop.")
         ticks = 0
-        while self._running:
-            updated, deactivated = db.deduct_one_second_all_active(self.db_path)
-            ticks += 1
-            if ticks % 10 == 0:
-                print(f"tick={ticks} updated={updated} deactivated={deactivated}")
-            time.sleep(self.interval)
+        reported = 0
+        pending = 0
+        with db.prepare_tick(self.db_path) as tick:
+            while self._running:
+                # One interval per sleep so a stop is noticed within an interval;
+                # ticks are charged only once their interval has fully elapsed.
+                # A stop signal does not cut the sleep short (PEP 475), so the
+                # interval it lands in still counts.
+                time.sleep(self.interval)
+                pending += 1
+                if not self._running:
+                    break
+                if pending < self.batch:
+                    continue
+                updated, deactivated = tick(pending)
+                ticks += pending
+                pending = 0
+                if ticks - reported >= 10:
+                    print(f"tick={ticks} updated={updated} deactivated={deactivated}")
+                    reported = ticks
+            if pending:
+                # Settle the part of a batch that elapsed before the stop
+                tick(pending)
+                ticks += pending
         print("Worker stopped.")
 
 
-def run(db_path: Path, interval_seconds: float = 1.0):
-    Worker(db_path, interval_seconds).run()
+def run(db_path: Path, interval_seconds: float = 1.0, batch_ticks: int = 1):
+    Worker(db_path, interval_seconds, batch_ticks).run()
@@ -1,5 +1,6 @@
 import argparse
 import getpass
+import time
 from pathlib import Path
 from typing import Optional
 
@@ -35,11 +36,10 @@ def _premium_info(db_path: Path, username: Optional[str]) -> tuple[bool, int]:
         return (False, 0)
     try:
         p = tkdb.is_premium(db_path, username)
-        import time as _t
         active = bool(p.get("active"))
         rem = 0
         if active:
-            rem = max(0, int(p.get("until", 0)) - int(_t.time()))
+            rem = max(0, int(p.get("until", 0)) - int(time.time()))
         return (active, rem)
     except Exception:
         return (False, 0)
@@ -68,7 +68,8 @@ def cmd_list(db_path: Path, username: Optional[str] = None) -> None:
     if prem_active:
         headers.append(f"Your price (-{int(disc_frac*100)}%)")
     rows = []
-    idx = tkdb.get_market_index_percent(db_path)
+    # Listed prices were computed with this index in the same read
+    idx = items[0]["market_index_percent"]
     for it in items:
         restores = []
         if it["restore_energy"]:
@@ -111,11 +112,12 @@ def cmd_buy(db_path: Path, username: str, item: str, qty: int, apply_now: bool =
 
 
 def cmd_prices(db_path: Path, username: Optional[str] = None) -> None:
-    idx = tkdb.get_market_index_percent(db_path)
     prices = tkdb.get_store_prices(db_path)
     if not prices:
         print(Fore.YELLOW + "No price data yet. Seed items first.")
         return
+    # Same read as the prices, so the effective column matches what a purchase charges
+    idx = prices[0]["market_index_percent"]
     # We don't have names in the prices table; join comes in list view.
     prem_active, _ = _premium_info(db_path, username)
     _, disc_frac = _premium_tier_discount(db_path, username)